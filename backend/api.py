@@ -5,11 +5,21 @@ This module serves as an API bridge between the React frontend and the Python ba
 It uses Flask to create a simple REST API.
 """
 
-from flask import Flask, request, jsonify, make_response
+from flask import Flask, request, jsonify, make_response, g
 from flask_cors import CORS
 from flask_restful import Resource, Api
+import gc
+import threading
 import time
-from game import TicTacToe, TicTacToeAI
+from concurrent.futures import TimeoutError as SearchTimeout
+import config
+from game import TREE_FORMATS
+from game_store import GameStore
+from mcts import MCTSAI
+from ponder import Ponderer
+from preload import OpeningBook, book_key, preload_tables
+from search_pool import ALGORITHMS, SearchPool, SearchPoolFull, run_search, run_analysis
+from shared_table import get_shared_table
 
 app = Flask(__name__)
 # Remove CORS initialization
@@ -31,17 +41,291 @@ def add_cors_headers(response):
 @app.route('/api/ai_make_move', methods=['OPTIONS'])
 @app.route('/api/game_state', methods=['OPTIONS'])
 @app.route('/api/decision_tree', methods=['OPTIONS'])
+@app.route('/api/play_turn', methods=['OPTIONS'])
+@app.route('/api/analysis', methods=['OPTIONS'])
+@app.route('/api/server_status', methods=['OPTIONS'])
 def handle_options():
     return '', 200
 
-# Game instance for the server
-game = TicTacToe()
-ai = TicTacToeAI('O')  # AI plays as O by default
+# Searches run here instead of on the request thread
+search_pool = SearchPool(config.MAX_SEARCHES, config.SEARCH_QUEUE_DEPTH, config.SEARCH_EXECUTOR)
+
+# Background searches of the human's possible moves, if enabled
+ponderer = Ponderer(config.PONDER_SEARCHES, config.PONDER_QUEUE_DEPTH) if config.PONDER else None
+
+# Games served by the API, selected by the optional game_id parameter
+games = GameStore(config.MAX_GAMES, on_evict=ponderer.cancel if ponderer else None)
+
+# Results of the opening searches, filled by create_app()
+opening_book = OpeningBook()
+
+# Startup time of the server and latency of the first request this process served
+startup = {
+    "startup_ms": None,
+    "first_request_ms": None,
+    "first_request_path": None
+}
+_first_request_lock = threading.Lock()
+
+
+def create_app(preload=None, snapshot=None):
+    """
+    Prepare the API for serving and return the Flask app.
+
+    Call this once in the server's main process, before worker processes
+    fork. It builds the engine tables and the opening book (from the
+    snapshot file when there is one), then freezes the garbage collector:
+    the objects created so far are never scanned or moved again, so forked
+    workers keep sharing their memory pages with the main process instead
+    of copying them.
+
+    Args:
+        preload: Whether to build the tables and the opening book, or None
+                 for config.PRELOAD
+        snapshot: Snapshot file of the opening book, or None for
+                  config.SNAPSHOT
+
+    Returns:
+        Flask: The app
+    """
+    start_time = time.time()
+    preload = config.PRELOAD if preload is None else preload
+    snapshot = config.SNAPSHOT if snapshot is None else snapshot
+
+    if preload and opening_book.source is None:
+        preload_tables()
+        opening_book.warm(config.PRELOAD_ALGORITHMS, snapshot)
+
+    gc.collect()
+    gc.freeze()
+
+    startup["startup_ms"] = (time.time() - start_time) * 1000
+    app.logger.info("Startup took %.0f ms, opening book: %d entries",
+                    startup["startup_ms"], len(opening_book))
+    return app
+
+
+def shutdown_pools():
+    """Stop this process's search and pondering workers."""
+    search_pool.shutdown(wait=False)
+    if ponderer:
+        ponderer.pool.shutdown(wait=False)
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.time()
+
+
+@app.after_request
+def record_first_request(response):
+    """Record the latency of the first request served by this process."""
+    if startup["first_request_ms"] is None and 'request_start' in g:
+        with _first_request_lock:
+            if startup["first_request_ms"] is None:
+                startup["first_request_ms"] = (time.time() - g.request_start) * 1000
+                startup["first_request_path"] = request.path
+    return response
+
+
+def get_session():
+    """Get the game session addressed by the current request."""
+    data = request.get_json(silent=True) or {}
+    return games.get(data.get('game_id') or request.args.get('game_id'))
+
+
+def busy_response():
+    """Response for a search rejected by the search pool."""
+    response = jsonify({
+        "status": "error",
+        "message": "Server is busy, try again shortly"
+    })
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+
+def get_algorithm(data):
+    """
+    Get the search algorithm requested in a request body.
+
+    Clients that do not send an algorithm choose between minimax and
+    alpha_beta with use_alpha_beta.
+
+    Returns:
+        tuple: (algorithm, None), or (None, error response) if the
+               algorithm is not one of ALGORITHMS
+    """
+    algorithm = data.get('algorithm')
+    if algorithm is None:
+        return ('alpha_beta' if data.get('use_alpha_beta', True) else 'minimax'), None
+    if algorithm not in ALGORITHMS:
+        return None, (jsonify({
+            "status": "error",
+            "message": f"algorithm must be one of: {', '.join(ALGORITHMS)}"
+        }), 400)
+    return algorithm, None
+
+
+def mcts_engine(session, player):
+    """
+    Get the MCTS engine for a search.
+
+    With the thread executor, a session's engine is kept for the next
+    move so its search tree is reused. Worker processes only get a copy of
+    the engine, so they always start from a new tree.
+    """
+    if session is None or config.SEARCH_EXECUTOR != 'thread':
+        return MCTSAI(player, config.MCTS_ITERATIONS, config.MCTS_TIME_MS)
+    with session.lock:
+        engine = session.mcts_engines.get(player)
+        if engine is None:
+            engine = MCTSAI(player, config.MCTS_ITERATIONS, config.MCTS_TIME_MS)
+            session.mcts_engines[player] = engine
+        return engine
+
+
+def search_stats(result):
+    """Get the statistics reported for a search result."""
+    stats = {
+        "nodes_explored": result['nodes_explored'],
+        "decision_time_ms": result['decision_time_ms']
+    }
+    if 'playouts' in result:
+        stats["playouts"] = result['playouts']
+        stats["playouts_per_second"] = result['playouts_per_second']
+    if result.get('preloaded'):
+        stats["preloaded"] = True
+    return stats
+
+
+def is_top_k(value):
+    """Check that a top K option is None or a positive integer."""
+    return value is None or (isinstance(value, int) and not isinstance(value, bool)
+                             and value >= 1)
+
+
+def get_tree_options(data):
+    """
+    Get the decision tree format and summary size requested in a request body.
+
+    Returns:
+        tuple: (tree format, summary top K, None), or (None, None, error
+               response) if the options are invalid
+    """
+    tree_format = data.get('tree_format') or 'tree'
+    if tree_format not in TREE_FORMATS:
+        return None, None, (jsonify({
+            "status": "error",
+            "message": f"tree_format must be one of: {', '.join(TREE_FORMATS)}"
+        }), 400)
+    summary_top_k = data.get('summary_top_k')
+    if not is_top_k(summary_top_k):
+        return None, None, (jsonify({
+            "status": "error",
+            "message": "summary_top_k must be a positive integer"
+        }), 400)
+    return tree_format, summary_top_k, None
+
+
+def search(state, player, use_alpha_beta, include_tree=True, tree_depth=None, session=None,
+           tree_format='tree', summary_top_k=None, algorithm=None):
+    """
+    Run a search on the search pool and wait for the result.
+
+    Opening positions are answered from the opening book. When a session
+    is given, the search is about to be played, so a result precomputed by
+    pondering is used if there is one and pondering stops.
+    MCTS searches are not pondered; they reuse the session's MCTS tree instead.
+    Waiting for a pondering search and searching anew share one
+    SEARCH_TIMEOUT.
+
+    Returns:
+        tuple: (result, None) on success, or (None, error response) if the
+               search was rejected or timed out
+    """
+    deadline = time.monotonic() + config.SEARCH_TIMEOUT
+    engine = None
+    if algorithm == 'mcts':
+        engine = mcts_engine(session, player)
+    else:
+        start_time = time.time()
+        result = opening_book.get(book_key(state['board'], player, use_alpha_beta, include_tree,
+                                           tree_depth, tree_format, summary_top_k))
+        if result is not None:
+            return dict(result, decision_time_ms=(time.time() - start_time) * 1000,
+                        preloaded=True), None
+
+    if engine is None and session is not None and ponderer:
+        start_time = time.time()
+        result = ponderer.take(session, state, player, use_alpha_beta, include_tree,
+                               tree_depth, tree_format, summary_top_k,
+                               timeout=max(0, deadline - time.monotonic()))
+        if result is not None:
+            # Report the time this request waited, not the background search time
+            return dict(result, decision_time_ms=(time.time() - start_time) * 1000,
+                        pondered=True), None
+
+    cancel_event = search_pool.cancel_event()
+    try:
+        remaining = deadline - time.monotonic()
+        # The wait for the pondering search used up the time
+        if remaining <= 0:
+            raise SearchTimeout()
+        result = search_pool.run(run_search, state, player, use_alpha_beta, include_tree,
+                                 None, tree_depth, cancel_event, tree_format, summary_top_k,
+                                 engine, timeout=remaining, cancel_event=cancel_event)
+    except SearchPoolFull:
+        return None, busy_response()
+    except SearchTimeout:
+        return None, (jsonify({
+            "status": "error",
+            "message": "Search timed out"
+        }), 504)
+    return result, None
+
+
+def start_pondering(session, player, use_alpha_beta, include_tree=True, tree_depth=None,
+                    tree_format='tree', summary_top_k=None, algorithm=None):
+    """Ponder the human's replies after the AI moved, if pondering is enabled."""
+    if ponderer and algorithm != 'mcts':
+        with session.lock:
+            ponderer.start(session, player, use_alpha_beta, include_tree, tree_depth,
+                           tree_format, summary_top_k)
+
+
+def play_searched_move(session, state, move):
+    """
+    Make a move that was searched on a snapshot of the game.
+
+    Args:
+        session: GameSession the search was run for
+        state: The game state the search was run on
+        move: (row, col) tuple chosen by the search
+
+    Returns:
+        dict: The new game state, or None if the game changed since the
+              snapshot was taken and the move was not made
+    """
+    with session.lock:
+        game = session.game
+        if session.turn_in_progress:
+            return None
+        if game.board != state['board'] or game.current_player != state['current_player']:
+            return None
+        game.make_move(*move)
+        session.publish()
+        return session.state
 
 @app.route('/api/reset', methods=['POST'])
 def reset_game():
     """Reset the game state."""
-    game.reset_game()
+    session = get_session()
+    with session.lock:
+        session.game.reset_game()
+        session.publish()
+        session.mcts_engines = {}
+        if ponderer:
+            ponderer.cancel(session)
     return jsonify({"status": "success", "message": "Game reset"})
 
 @app.route('/api/make_move', methods=['POST'])
@@ -54,45 +338,49 @@ def make_move():
     if row is None or col is None:
         return jsonify({"status": "error", "message": "Row and column are required"}), 400
     
-    success = game.make_move(row, col)
+    session = get_session()
+    with session.lock:
+        if session.turn_in_progress:
+            return jsonify({
+                "status": "error",
+                "message": "The AI is replying to another move"
+            }), 409
+        success = session.game.make_move(row, col)
+        session.publish()
+        game_state = session.state
+        if success and ponderer:
+            ponderer.narrow(session, game_state['board'])
     
     if not success:
         return jsonify({"status": "error", "message": "Invalid move"}), 400
     
     return jsonify({
         "status": "success",
-        "game_state": game.get_game_state()
+        "game_state": game_state
     })
 
 @app.route('/api/get_ai_move', methods=['POST'])
 def get_ai_move():
     """Get the best move for the AI based on the current game state."""
     data = request.json
-    use_alpha_beta = data.get('use_alpha_beta', True)
+    algorithm, error = get_algorithm(data)
+    if error:
+        return error
+    use_alpha_beta = algorithm != 'minimax'
     player = data.get('player', 'O')
+    tree_format, summary_top_k, error = get_tree_options(data)
+    if error:
+        return error
     
-    # Update AI player if necessary
-    if ai.player != player:
-        ai.player = player
-        ai.opponent = 'X' if player == 'O' else 'O'
-    
-    # Record start time for performance measurement
-    start_time = time.time()
-    
-    # FIX: Reset the nodes_explored counter before making calculations
-    ai.nodes_explored = 0
+    state = get_session().state
     
     # Get best move from AI
-    best_move = ai.get_best_move(game, use_alpha_beta)
-    
-    # FIX: Get the total nodes explored (not the difference)
-    nodes_explored = ai.nodes_explored
+    result, error = search(state, player, use_alpha_beta, tree_format=tree_format,
+                           summary_top_k=summary_top_k, algorithm=algorithm)
+    if error:
+        return error
     
-    # Get the decision tree for visualization
-    decision_tree = ai.get_decision_tree()
-    
-    # Calculate time taken
-    decision_time = (time.time() - start_time) * 1000  # Convert to milliseconds
+    best_move = result['move']
     
     if best_move is None:
         return jsonify({
@@ -107,49 +395,41 @@ def get_ai_move():
             "row": best_move[0],
             "col": best_move[1]
         },
-        "stats": {
-            "nodes_explored": nodes_explored,
-            "decision_time_ms": decision_time
-        },
-        "decision_tree": decision_tree
+        "stats": search_stats(result),
+        "decision_tree": result['decision_tree']
     })
 
 @app.route('/api/ai_make_move', methods=['POST'])
 def ai_make_move():
     """Get the best move for the AI and make that move on the board."""
     data = request.json
-    use_alpha_beta = data.get('use_alpha_beta', True)
+    algorithm, error = get_algorithm(data)
+    if error:
+        return error
+    use_alpha_beta = algorithm != 'minimax'
     player = data.get('player', 'O')
+    tree_format, summary_top_k, error = get_tree_options(data)
+    if error:
+        return error
     
-    # Update AI player if necessary
-    if ai.player != player:
-        ai.player = player
-        ai.opponent = 'X' if player == 'O' else 'O'
+    session = get_session()
+    state = session.state
     
     # Make sure it's the AI's turn
-    if game.current_player != ai.player:
+    if state['current_player'] != player:
         return jsonify({
             "status": "error",
-            "message": f"Not {ai.player}'s turn"
+            "message": f"Not {player}'s turn"
         }), 400
     
-    # Record start time for performance measurement
-    start_time = time.time()
-    
-    # FIX: Reset the nodes_explored counter before making calculations
-    ai.nodes_explored = 0
-    
     # Get best move from AI
-    best_move = ai.get_best_move(game, use_alpha_beta)
-    
-    # FIX: Get the total nodes explored (not the difference)
-    nodes_explored = ai.nodes_explored
+    result, error = search(state, player, use_alpha_beta, session=session,
+                           tree_format=tree_format, summary_top_k=summary_top_k,
+                           algorithm=algorithm)
+    if error:
+        return error
     
-    # Get the decision tree for visualization
-    decision_tree = ai.get_decision_tree()
-    
-    # Calculate time taken
-    decision_time = (time.time() - start_time) * 1000  # Convert to milliseconds
+    best_move = result['move']
     
     if best_move is None:
         return jsonify({
@@ -157,15 +437,18 @@ def ai_make_move():
             "message": "No valid moves available"
         }), 400
     
-    # Make the move
+    # Make the move, unless the game changed while the AI was thinking
     row, col = best_move
-    success = game.make_move(row, col)
+    game_state = play_searched_move(session, state, best_move)
     
-    if not success:
+    if game_state is None:
         return jsonify({
             "status": "error",
-            "message": "Failed to make AI move"
-        }), 500
+            "message": "Game changed during AI move"
+        }), 409
+    
+    start_pondering(session, player, use_alpha_beta, tree_format=tree_format,
+                    summary_top_k=summary_top_k, algorithm=algorithm)
     
     return jsonify({
         "status": "success",
@@ -173,12 +456,9 @@ def ai_make_move():
             "row": row,
             "col": col
         },
-        "game_state": game.get_game_state(),
-        "stats": {
-            "nodes_explored": nodes_explored,
-            "decision_time_ms": decision_time
-        },
-        "decision_tree": decision_tree
+        "game_state": game_state,
+        "stats": dict(search_stats(result), pondered=result.get('pondered', False)),
+        "decision_tree": result['decision_tree']
     })
 
 @app.route('/api/game_state', methods=['GET'])
@@ -186,7 +466,7 @@ def get_game_state():
     """Get the current game state."""
     return jsonify({
         "status": "success",
-        "game_state": game.get_game_state()
+        "game_state": get_session().state
     })
 
 @app.route('/api/decision_tree', methods=['POST'])
@@ -196,40 +476,196 @@ def get_decision_tree():
     This endpoint allows getting the tree without making a move.
     """
     data = request.json
-    use_alpha_beta = data.get('use_alpha_beta', True)
-    player = data.get('player', game.current_player)
-    
-    # Update AI player if necessary
-    if ai.player != player:
-        ai.player = player
-        ai.opponent = 'X' if player == 'O' else 'O'
+    algorithm, error = get_algorithm(data)
+    if error:
+        return error
+    use_alpha_beta = algorithm != 'minimax'
+    tree_format, summary_top_k, error = get_tree_options(data)
+    if error:
+        return error
     
-    # Record start time for performance measurement
-    start_time = time.time()
+    state = get_session().state
     
-    # FIX: Reset the nodes_explored counter before making calculations
-    ai.nodes_explored = 0
+    player = data.get('player') or state['current_player']
     
     # Get best move from AI (this generates the decision tree)
-    best_move = ai.get_best_move(game, use_alpha_beta)
+    result, error = search(state, player, use_alpha_beta, tree_format=tree_format,
+                           summary_top_k=summary_top_k, algorithm=algorithm)
+    if error:
+        return error
+    
+    return jsonify({
+        "status": "success",
+        "stats": search_stats(result),
+        "decision_tree": result['decision_tree']
+    })
+
+@app.route('/api/play_turn', methods=['POST'])
+def play_turn():
+    """
+    Make a human move and the AI's reply in one request.
     
-    # FIX: Get the total nodes explored (not the difference)
-    nodes_explored = ai.nodes_explored
+    The game is only locked while each move is made, not during the AI's
+    search. Until the reply is made the turn is marked in progress, so no
+    other move can be made in between; if the game is reset meanwhile, the
+    reply is dropped. If the AI cannot reply, the human move is rolled back
+    as well.
+    """
+    data = request.json
+    row = data.get('row')
+    col = data.get('col')
+    algorithm, error = get_algorithm(data)
+    if error:
+        return error
+    use_alpha_beta = algorithm != 'minimax'
+    player = data.get('player', 'O')
+    include_tree = data.get('include_tree', False)
+    tree_depth = data.get('tree_depth')
+    tree_format, summary_top_k, error = get_tree_options(data)
+    if error:
+        return error
     
-    # Get the decision tree for visualization
-    decision_tree = ai.get_decision_tree()
+    if row is None or col is None:
+        return jsonify({"status": "error", "message": "Row and column are required"}), 400
     
-    # Calculate time taken
-    decision_time = (time.time() - start_time) * 1000  # Convert to milliseconds
+    session = get_session()
+    with session.lock:
+        if session.turn_in_progress:
+            return jsonify({
+                "status": "error",
+                "message": "The AI is replying to another move"
+            }), 409
+        
+        state_before = session.game.get_game_state()
+        
+        # Make sure it's the human's turn
+        if state_before['current_player'] == player:
+            return jsonify({
+                "status": "error",
+                "message": "Not the human's turn"
+            }), 400
+        
+        if not session.game.make_move(row, col):
+            return jsonify({"status": "error", "message": "Invalid move"}), 400
+        
+        session.publish()
+        state = session.state
+        
+        # The human move ended the game, there is nothing to reply to
+        if state['game_over']:
+            return jsonify({
+                "status": "success",
+                "human_move": {"row": row, "col": col},
+                "move": None,
+                "game_state": state,
+                "stats": None,
+                "decision_tree": None
+            })
+        
+        session.turn_in_progress = True
+        version = session.version
+    
+    # Get the AI's reply without holding the lock
+    try:
+        result, error = search(state, player, use_alpha_beta, include_tree, tree_depth,
+                               session=session, tree_format=tree_format,
+                               summary_top_k=summary_top_k, algorithm=algorithm)
+    except Exception:
+        with session.lock:
+            session.turn_in_progress = False
+        raise
+    
+    with session.lock:
+        session.turn_in_progress = False
+        # The game was reset while the AI was thinking
+        if session.version != version:
+            return jsonify({
+                "status": "error",
+                "message": "Game changed during AI move"
+            }), 409
+        
+        if error:
+            session.restore(state_before)
+            return error
+        
+        session.game.make_move(*result['move'])
+        session.publish()
+        game_state = session.state
+        start_pondering(session, player, use_alpha_beta, include_tree, tree_depth,
+                        tree_format, summary_top_k, algorithm)
     
     return jsonify({
         "status": "success",
-        "stats": {
-            "nodes_explored": nodes_explored,
-            "decision_time_ms": decision_time
+        "human_move": {"row": row, "col": col},
+        "move": {
+            "row": result['move'][0],
+            "col": result['move'][1]
         },
-        "decision_tree": decision_tree
+        "game_state": game_state,
+        "stats": dict(search_stats(result), pondered=result.get('pondered', False)),
+        "decision_tree": result['decision_tree']
+    })
+
+@app.route('/api/analysis', methods=['POST'])
+def get_analysis():
+    """
+    Score the best moves of the current game state in a single search.
+    Returns exact scores and principal variations without the decision tree.
+    """
+    data = request.json
+    top_k = data.get('top_k')
+    if not is_top_k(top_k):
+        return jsonify({"status": "error", "message": "top_k must be a positive integer"}), 400
+    
+    state = get_session().state
+    player = data.get('player') or state['current_player']
+    
+    # Only the player to move has moves to score
+    if player != state['current_player']:
+        return jsonify({
+            "status": "error",
+            "message": f"Not {player}'s turn"
+        }), 400
+    
+    cancel_event = search_pool.cancel_event()
+    try:
+        result = search_pool.run(run_analysis, state, player, top_k, cancel_event,
+                                 timeout=config.SEARCH_TIMEOUT, cancel_event=cancel_event)
+    except SearchPoolFull:
+        return busy_response()
+    except SearchTimeout:
+        return jsonify({"status": "error", "message": "Search timed out"}), 504
+    
+    return jsonify({
+        "status": "success",
+        "player": player,
+        "moves": [
+            {
+                "move": {"row": line['move'][0], "col": line['move'][1]},
+                "score": line['score'],
+                "pv": [{"row": row, "col": col} for row, col in line['pv']]
+            }
+            for line in result['lines']
+        ],
+        "stats": {
+            "nodes_explored": result['nodes_explored'],
+            "decision_time_ms": result['decision_time_ms']
+        }
+    })
+
+@app.route('/api/server_status', methods=['GET'])
+def get_server_status():
+    """Get the load of the search pool and the game store."""
+    shared_table = get_shared_table()
+    return jsonify({
+        "status": "success",
+        "search_pool": search_pool.stats(),
+        "ponder_pool": ponderer.stats() if ponderer else None,
+        "shared_table": shared_table.stats() if shared_table else None,
+        "opening_book": opening_book.stats(),
+        "startup": startup,
+        "games": len(games)
     })
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5001)
+    create_app().run(debug=True, port=config.PORT)
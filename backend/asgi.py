@@ -0,0 +1,176 @@
+"""
+TicTacMaster - ASGI Entry Point
+
+Serves the Flask API from an asyncio server. `python asgi.py` reads the
+port and worker count from config.py, builds the app once (preloading the
+engine state, see api.create_app) and then forks its uvicorn workers, which
+share that state copy-on-write. A preloading server does the same:
+
+    gunicorn asgi:app --preload --workers 4 --worker-class uvicorn.workers.UvicornWorker
+
+`uvicorn asgi:app --port 5001` also works, but each of uvicorn's --workers
+is a fresh process that builds its own copy of the state.
+
+Each request handler runs on a bounded thread pool and every AI search
+is offloaded to the search pool in api.py, so a long search never blocks
+cheap endpoints like /api/game_state.
+
+WebSocket routes from ws_api.py are only available in this mode.
+"""
+import os
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+import config
+import ws_api
+from api import create_app, shutdown_pools
+
+
+class PooledWsgiToAsgiInstance(WsgiToAsgiInstance):
+    """
+    Per-request adapter instance that runs the WSGI app on a thread pool.
+    """
+
+    def __init__(self, wsgi_application, executor, duplicate_header_limit):
+        super().__init__(wsgi_application, duplicate_header_limit)
+        self.executor = executor
+
+    async def run_wsgi_app(self, body):
+        await sync_to_async(self._run_wsgi_app, thread_sensitive=False,
+                            executor=self.executor)(body)
+
+    def _run_wsgi_app(self, body):
+        """
+        Run the WSGI app on a request thread and stream its response, as
+        WsgiToAsgiInstance.run_wsgi_app does on asgiref's shared thread.
+        """
+        try:
+            environ = self.build_environ(self.scope, body)
+        except ValueError:
+            # Too many duplicate headers
+            self.sync_send({
+                "type": "http.response.start",
+                "status": 400,
+                "headers": [(b"content-type", b"text/plain")],
+            })
+            self.sync_send({"type": "http.response.body", "body": b"Bad Request"})
+            return
+
+        bytes_sent = 0
+        response = self.wsgi_application(environ, self.start_response)
+        try:
+            for output in response:
+                if not self.response_started:
+                    self.response_started = True
+                    self.sync_send(self.response_start)
+                # Never send more than the Content-Length the app declared
+                if self.response_content_length is not None:
+                    output = output[:self.response_content_length - bytes_sent]
+                self.sync_send({"type": "http.response.body", "body": output, "more_body": True})
+                bytes_sent += len(output)
+                if bytes_sent == self.response_content_length:
+                    break
+        finally:
+            if hasattr(response, 'close'):
+                response.close()
+
+        if not self.response_started:
+            self.response_started = True
+            self.sync_send(self.response_start)
+        self.sync_send({"type": "http.response.body"})
+
+
+class PooledWsgiToAsgi(WsgiToAsgi):
+    """
+    WSGI to ASGI adapter that runs requests concurrently.
+
+    The stock asgiref adapter runs every request on one shared thread,
+    which would serialize the whole API behind the slowest search.
+    """
+
+    def __init__(self, wsgi_application, threads):
+        super().__init__(wsgi_application)
+        self.executor = ThreadPoolExecutor(max_workers=threads,
+                                           thread_name_prefix='request')
+
+    async def __call__(self, scope, receive, send):
+        instance = PooledWsgiToAsgiInstance(self.wsgi_application, self.executor,
+                                            self.duplicate_header_limit)
+        await instance(scope, receive, send)
+
+
+# Built at import, so that workers forked by serve() or by a preloading
+# server (gunicorn --preload) start with the opening book and frozen GC
+# state already in place
+http_app = PooledWsgiToAsgi(create_app(), config.REQUEST_THREADS)
+
+
+async def app(scope, receive, send):
+    """Route HTTP requests to Flask and WebSocket connections to ws_api."""
+    if scope['type'] == 'http':
+        await http_app(scope, receive, send)
+    elif scope['type'] == 'websocket':
+        handler = ws_api.routes.get(scope['path'])
+        if handler is None:
+            await send({'type': 'websocket.close', 'code': 1008})
+            return
+        await handler(scope, receive, send)
+    elif scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                # Worker processes of the process executor would outlive us
+                shutdown_pools()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def serve(port, workers):
+    """
+    Serve the app with uvicorn from workers forked from this process.
+
+    The app was built at import, so the workers fork with the preloaded
+    engine state in place and share it copy-on-write. (uvicorn's own
+    --workers spawns fresh interpreters that each build it again.)
+
+    Args:
+        port: Port to listen on
+        workers: Number of server processes
+    """
+    import uvicorn
+    server_config = uvicorn.Config(app, port=port)
+    if workers <= 1 or not hasattr(os, 'fork'):
+        uvicorn.Server(server_config).run()
+        return
+
+    # The workers accept connections on one socket bound here
+    sock = server_config.bind_socket()
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                uvicorn.Server(server_config).run(sockets=[sock])
+            finally:
+                os._exit(0)
+        children.append(pid)
+
+    def stop(signum, frame):
+        for child in children:
+            try:
+                os.kill(child, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    # Ctrl+C reaches the workers directly; wait for them to shut down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for child in children:
+        os.waitpid(child, 0)
+
+
+if __name__ == '__main__':
+    serve(config.PORT, config.WORKERS)
@@ -0,0 +1,341 @@
+"""
+TicTacMaster - Engine Benchmark
+
+Runs TicTacToeAI.get_best_move over a fixed corpus of positions with and
+without Alpha-Beta pruning and measures node counts, wall time, memory and
+the cost of building and serializing the decision tree. Results are written
+as JSON and compared against a stored baseline:
+
+    python benchmark.py                       # run and compare to the baseline
+    python benchmark.py --quick               # skip the all-positions corpus
+    python benchmark.py --update-baseline     # store the results as the new baseline
+
+The exit status is 1 when any metric regressed beyond its threshold.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from game import TicTacToe, TicTacToeAI
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+# Positions given as the moves played from the empty board
+TACTICAL_POSITIONS = {
+    # X completes the top row
+    'win_in_one': [(0, 0), (1, 0), (0, 1), (1, 1)],
+    # O must block the top row
+    'must_block': [(0, 0), (1, 1), (0, 1)],
+    # X can create two threats at once
+    'fork': [(0, 0), (0, 1), (2, 2), (1, 1)],
+    # O must prevent the opposite-corner fork
+    'defend_fork': [(0, 0), (1, 1), (2, 2)],
+    # X must block the top row at (0, 1)
+    'single_save': [(1, 1), (0, 0), (2, 2), (0, 2)]
+}
+
+# Metrics compared against the baseline, grouped by regression threshold
+NODE_METRICS = ['nodes_explored']
+TIME_METRICS = ['search_ms', 'serialize_ms']
+MEMORY_METRICS = ['peak_bytes', 'retained_bytes', 'allocated_blocks', 'json_bytes', 'dag_json_bytes']
+
+ALGORITHMS = {
+    'minimax': False,
+    'alpha_beta': True
+}
+
+
+def position_from_moves(moves):
+    """Play a list of moves from the empty board."""
+    game = TicTacToe()
+    for row, col in moves:
+        game.make_move(row, col)
+    return game
+
+
+def reachable_positions():
+    """
+    Get every position reachable from the empty board where a move remains.
+
+    Returns:
+        list: TicTacToe instances, in breadth-first order
+    """
+    positions = []
+    seen = set()
+    frontier = [TicTacToe()]
+    while frontier:
+        next_frontier = []
+        for game in frontier:
+            key = game.position_key()
+            if key in seen or game.game_over:
+                continue
+            seen.add(key)
+            positions.append(game)
+            for row, col in game.get_available_moves():
+                child = TicTacToe.from_game_state(game.get_game_state())
+                child.make_move(row, col)
+                next_frontier.append(child)
+        frontier = next_frontier
+    return positions
+
+
+def build_corpus(quick=False):
+    """
+    Get the benchmark corpus.
+
+    Args:
+        quick: Skip the corpus of every reachable position
+
+    Returns:
+        dict: Corpus name to list of TicTacToe instances
+    """
+    corpus = {
+        'empty_board': [TicTacToe()],
+        'tactical': [position_from_moves(moves) for moves in TACTICAL_POSITIONS.values()]
+    }
+    if not quick:
+        corpus['all_positions'] = reachable_positions()
+    return corpus
+
+
+def measure_speed(games, use_alpha_beta, repeat):
+    """
+    Time the search and tree serialization over a set of positions.
+
+    The fastest of `repeat` runs is reported to reduce timer noise.
+
+    Returns:
+        dict: Node count, tree size and timings
+    """
+    best = None
+    for _ in range(repeat):
+        nodes_explored = 0
+        tree_nodes = 0
+        json_bytes = 0
+        dag_json_bytes = 0
+        search_time = 0.0
+        serialize_time = 0.0
+
+        # Collect the trees left by the previous corpus or run, so their
+        # collection is not timed as part of this run's searches
+        gc.collect()
+
+        for game in games:
+            ai = TicTacToeAI(game.current_player)
+
+            start_time = time.perf_counter()
+            ai.get_best_move(game, use_alpha_beta)
+            search_time += time.perf_counter() - start_time
+
+            start_time = time.perf_counter()
+            tree = ai.get_decision_tree()
+            serialize_time += time.perf_counter() - start_time
+
+            nodes_explored += ai.nodes_explored
+            if tree:
+                tree_nodes += count_tree_nodes(tree['root'])
+                json_bytes += len(json.dumps(tree))
+                dag_json_bytes += len(json.dumps(ai.get_decision_tree(tree_format='dag')))
+
+        run = {
+            'positions': len(games),
+            'nodes_explored': nodes_explored,
+            'tree_nodes': tree_nodes,
+            'json_bytes': json_bytes,
+            'dag_json_bytes': dag_json_bytes,
+            'search_ms': search_time * 1000,
+            'serialize_ms': serialize_time * 1000
+        }
+        if best is None or run['search_ms'] + run['serialize_ms'] < best['search_ms'] + best['serialize_ms']:
+            best = run
+    return best
+
+
+def measure_memory(games, use_alpha_beta):
+    """
+    Measure the memory used by the search and the decision tree it keeps.
+
+    Runs separately from the timings, since tracing allocations slows
+    Python down considerably.
+
+    Returns:
+        dict: Peak traced memory, memory still held after the search and
+              the number of allocated blocks the tree keeps alive
+    """
+    peak_bytes = 0
+    retained_bytes = 0
+    allocated_blocks = 0
+
+    for game in games:
+        ai = TicTacToeAI(game.current_player)
+
+        # Decision trees are reference cycles (parent <-> children). Collect
+        # the previous ones first and keep the collector from freeing garbage
+        # in the middle of the measurement.
+        gc.collect()
+        gc.disable()
+        tracemalloc.start()
+        blocks_before = sys.getallocatedblocks()
+        before, _ = tracemalloc.get_traced_memory()
+        ai.get_best_move(game, use_alpha_beta)
+        after, _ = tracemalloc.get_traced_memory()
+        blocks_after = sys.getallocatedblocks()
+        ai.get_decision_tree()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        gc.enable()
+
+        peak_bytes = max(peak_bytes, peak - before)
+        retained_bytes += after - before
+        allocated_blocks += blocks_after - blocks_before
+
+    return {
+        'peak_bytes': peak_bytes,
+        'retained_bytes': retained_bytes,
+        'allocated_blocks': allocated_blocks
+    }
+
+
+def count_tree_nodes(node):
+    """Count the nodes of a serialized decision tree."""
+    count = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.get('children', []))
+    return count
+
+
+def run_benchmarks(quick=False, repeat=3, memory=True):
+    """
+    Run every benchmark.
+
+    Returns:
+        dict: Benchmark results, keyed by "<corpus>/<algorithm>"
+    """
+    results = {}
+    for corpus_name, games in build_corpus(quick).items():
+        for algorithm, use_alpha_beta in ALGORITHMS.items():
+            name = f"{corpus_name}/{algorithm}"
+            print(f"Running {name} ({len(games)} positions)...", file=sys.stderr)
+            # The all-positions corpus is large; time it once
+            runs = 1 if corpus_name == 'all_positions' else repeat
+            result = measure_speed(games, use_alpha_beta, runs)
+            if memory:
+                result.update(measure_memory(games, use_alpha_beta))
+            results[name] = result
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'quick': quick,
+            'repeat': repeat
+        },
+        'results': results
+    }
+
+
+def compare(current, baseline, thresholds):
+    """
+    Compare results against a baseline.
+
+    Args:
+        current: Results from run_benchmarks()
+        baseline: Stored results from an earlier run
+        thresholds: Dict of metric name to the allowed relative increase
+
+    Returns:
+        list: Descriptions of every metric that regressed
+    """
+    regressions = []
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        for metric, allowed in thresholds.items():
+            if metric not in result or metric not in base:
+                continue
+            limit = base[metric] * (1 + allowed)
+            if result[metric] > limit:
+                regressions.append(
+                    f"{name} {metric}: {result[metric]:.0f} vs baseline {base[metric]:.0f} "
+                    f"(+{allowed:.0%} allowed)"
+                )
+    return regressions
+
+
+def print_report(results):
+    """Print a table of the results."""
+    print(f"{'benchmark':<28}{'nodes':>12}{'search ms':>12}{'to_dict ms':>12}{'peak KB':>12}")
+    for name, result in results['results'].items():
+        peak = result.get('peak_bytes')
+        print(f"{name:<28}{result['nodes_explored']:>12}{result['search_ms']:>12.1f}"
+              f"{result['serialize_ms']:>12.1f}{(peak / 1024 if peak is not None else 0):>12.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the TicTacMaster engine.')
+    parser.add_argument('--quick', action='store_true',
+                        help='skip the corpus of every reachable position')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='timing runs per benchmark, the fastest is kept')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='skip the (slow) memory measurements')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                        help='baseline results to compare against')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='store the results as the new baseline')
+    parser.add_argument('--max-node-regression', type=float, default=0.0,
+                        help='allowed relative increase in nodes explored')
+    parser.add_argument('--max-time-regression', type=float, default=0.5,
+                        help='allowed relative increase in wall time')
+    parser.add_argument('--max-memory-regression', type=float, default=0.2,
+                        help='allowed relative increase in memory and payload size')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.quick, max(1, args.repeat), not args.no_memory)
+    print_report(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, skipping comparison")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    thresholds = {}
+    thresholds.update({metric: args.max_node_regression for metric in NODE_METRICS})
+    thresholds.update({metric: args.max_time_regression for metric in TIME_METRICS})
+    thresholds.update({metric: args.max_memory_regression for metric in MEMORY_METRICS})
+
+    regressions = compare(results, baseline, thresholds)
+    if regressions:
+        print("\nRegressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+
+    print("\nNo regressions against the baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+TicTacMaster - Server Configuration
+
+Settings shared by the Flask app and the ASGI entry point. Every value can
+be overridden through an environment variable so that deployments can be
+tuned without code changes.
+"""
+import os
+
+
+def _env_bool(name, default):
+    """Read an on/off setting from the environment."""
+    value = os.environ.get(name)
+    if value is None or value == '':
+        return default
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
+def _env_int(name, default):
+    """Read a positive integer setting from the environment."""
+    value = os.environ.get(name)
+    if value is None or value == '':
+        return default
+    return max(1, int(value))
+
+
+# Port the server listens on
+PORT = _env_int('TICTAC_PORT', 5001)
+
+# Number of server processes when running in ASGI mode
+WORKERS = _env_int('TICTAC_WORKERS', 1)
+
+# Threads available to run request handlers in ASGI mode. This must stay
+# above MAX_SEARCHES + SEARCH_QUEUE_DEPTH so that cheap endpoints always
+# find a free thread while searches are in flight.
+REQUEST_THREADS = _env_int('TICTAC_REQUEST_THREADS', 16)
+
+# Maximum number of AI searches running at the same time (per process)
+MAX_SEARCHES = _env_int('TICTAC_MAX_SEARCHES', 2)
+
+# Maximum number of admitted searches waiting for a free search slot
+SEARCH_QUEUE_DEPTH = _env_int('TICTAC_SEARCH_QUEUE', 4)
+
+# 'thread' or 'process' - where searches are executed
+SEARCH_EXECUTOR = os.environ.get('TICTAC_SEARCH_EXECUTOR', 'thread')
+
+# Search the AI's replies to every human move while the human is thinking
+PONDER = _env_bool('TICTAC_PONDER', False)
+
+# Maximum number of pondering searches running at the same time (per process)
+PONDER_SEARCHES = _env_int('TICTAC_PONDER_SEARCHES', 2)
+
+# Maximum number of pondering searches waiting for a free slot
+PONDER_QUEUE_DEPTH = _env_int('TICTAC_PONDER_QUEUE', 16)
+
+# Number of games kept in memory before the least recently used is evicted
+MAX_GAMES = _env_int('TICTAC_MAX_GAMES', 1000)
+
+# Seconds a request waits for its search before giving up
+SEARCH_TIMEOUT = _env_int('TICTAC_SEARCH_TIMEOUT', 60)
+
+# Budget of an MCTS search: it stops after this many playouts or this many
+# milliseconds, whichever comes first
+MCTS_ITERATIONS = _env_int('TICTAC_MCTS_ITERATIONS', 5000)
+MCTS_TIME_MS = _env_int('TICTAC_MCTS_TIME_MS', 1000)
+
+# Transposition table shared by the analysis searches of every process on
+# the host: 'shm' for a shared memory block, or the path of a file that
+# keeps the table across restarts. Disabled when empty.
+SHARED_TABLE = os.environ.get('TICTAC_SHARED_TABLE', '')
+
+# Number of entries of the shared transposition table (16 bytes each)
+SHARED_TABLE_ENTRIES = _env_int('TICTAC_SHARED_TABLE_ENTRIES', 65536)
+
+# Precompute the engine tables and the opening book in create_app(), before
+# server workers fork
+PRELOAD = _env_bool('TICTAC_PRELOAD', True)
+
+# Algorithms the opening book is searched with (comma separated). The
+# minimax searches of the empty board take several seconds, so they are
+# best combined with a snapshot.
+PRELOAD_ALGORITHMS = tuple(
+    name.strip() for name in os.environ.get('TICTAC_PRELOAD_ALGORITHMS', 'alpha_beta').split(',')
+    if name.strip()
+)
+
+# File the opening book is loaded from, or written to when it does not
+# exist yet. Disabled when empty.
+SNAPSHOT = os.environ.get('TICTAC_SNAPSHOT', '')
+
+# Decision tree nodes a search records before it stops keeping the tree
+# below TREE_CUTOFF_DEPTH levels. TREE_CAPTURE chooses what happens to those
+# subtrees: 'truncate' drops them, 'spill' moves them to a temporary file.
+TREE_NODE_BUDGET = _env_int('TICTAC_TREE_NODE_BUDGET', 100000)
+TREE_CAPTURE = os.environ.get('TICTAC_TREE_CAPTURE', 'truncate')
+TREE_CUTOFF_DEPTH = _env_int('TICTAC_TREE_CUTOFF_DEPTH', 3)
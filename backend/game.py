@@ -5,57 +5,207 @@ Backend Logic Module
 This module contains the core game logic and AI implementation using
 the Minimax algorithm with Alpha-Beta pruning.
 """
-import copy
+from functools import lru_cache
+from tree_store import SpillStore
+
+
+class SearchCancelled(Exception):
+    """Raised inside a search when its cancel event is set."""
+
+
+# Kinds of scores stored in a transposition table entry
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+# Bound types seen from the other player's point of view
+FLIPPED_BOUNDS = {EXACT: EXACT, LOWER_BOUND: UPPER_BOUND, UPPER_BOUND: LOWER_BOUND}
+
+# Serializations of the decision tree, see TicTacToeAI.get_decision_tree
+TREE_FORMATS = ('tree', 'dag', 'summary')
+
+# Lines kept at every node of a summary tree: the best move and the
+# alternatives ranked right after it
+SUMMARY_TOP_K = 3
+
+
+def _line_weight(marks, win_length):
+    """
+    Weight of a line holding marks of one player and none of the other, for
+    static evaluation. Lines one mark short of a win (open twos on 3x3, open
+    threes on 4x4) dominate.
+    """
+    if marks == 0 or marks >= win_length:
+        return 0
+    return 10 ** (marks - 1) * (10 if marks == win_length - 1 else 1)
+
+
+@lru_cache(maxsize=None)
+def _line_tables(size, win_length):
+    """
+    Precompute the winning lines of a board.
+
+    Args:
+        size: Number of rows and columns
+        win_length: Marks in a row needed to win
+
+    Returns:
+        tuple: (lines, cell_lines, move_order, weights) where lines is a
+               tuple of cell tuples, cell_lines[row][col] holds the indices
+               of the lines through a cell, move_order lists every cell,
+               those on the most lines first, and weights[n] is
+               _line_weight(n, win_length)
+    """
+    lines = []
+    directions = [(0, 1), (1, 0), (1, 1), (1, -1)]
+    for row in range(size):
+        for col in range(size):
+            for d_row, d_col in directions:
+                end_row = row + d_row * (win_length - 1)
+                end_col = col + d_col * (win_length - 1)
+                if 0 <= end_row < size and 0 <= end_col < size:
+                    lines.append(tuple((row + d_row * i, col + d_col * i)
+                                       for i in range(win_length)))
+
+    cell_lines = [[[] for _ in range(size)] for _ in range(size)]
+    for index, line in enumerate(lines):
+        for row, col in line:
+            cell_lines[row][col].append(index)
+    cell_lines = tuple(tuple(tuple(indices) for indices in row) for row in cell_lines)
+
+    cells = [(row, col) for row in range(size) for col in range(size)]
+    # Stable sort: on 3x3 this is center, corners, edges
+    move_order = tuple(sorted(cells, key=lambda cell: -len(cell_lines[cell[0]][cell[1]])))
+    weights = tuple(_line_weight(marks, win_length) for marks in range(win_length + 1))
+    return tuple(lines), cell_lines, move_order, weights
+
+
+@lru_cache(maxsize=None)
+def _max_evaluation(size, win_length):
+    """
+    Bound on the magnitude of TicTacToe.evaluate on a board: every line open
+    for one player and one mark short of a win.
+    """
+    lines, _, _, weights = _line_tables(size, win_length)
+    return len(lines) * max(weights) or 1
+
 
 class TicTacToe:
     """
     Represents the Tic-Tac-Toe game state and rules.
+    
+    Besides the board, the game keeps per-line occupancy counters for both
+    players. They are updated incrementally by make_move and undo_move, so
+    detecting a win only looks at the lines through the last move, and the
+    static evaluation used by depth-limited searches is kept up to date
+    without rescanning the board.
     """
     
-    def __init__(self):
-        """Initialize an empty 3x3 game board."""
-        # Board is represented as a 3x3 grid:
-        # None = empty cell
-        # 'X' or 'O' = cell taken by respective player
-        self.board = [[None for _ in range(3)] for _ in range(3)]
-        self.current_player = 'X'  # X always goes first in traditional rules
-        self.winner = None
-        self.game_over = False
-        self.moves_made = 0
+    def __init__(self, size=3, win_length=None):
+        """
+        Initialize an empty game board.
+        
+        Args:
+            size: Number of rows and columns (3 for the classic game)
+            win_length: Marks in a row needed to win, defaults to size
+        """
+        self.size = size
+        self.win_length = win_length or size
+        self.lines, self._cell_lines, self.move_order, self._weights = \
+            _line_tables(self.size, self.win_length)
+        self.reset_game()
     
     def reset_game(self):
         """Reset the game state to start a new game."""
-        self.board = [[None for _ in range(3)] for _ in range(3)]
-        self.current_player = 'X'
+        # Board is represented as a size x size grid:
+        # None = empty cell
+        # 'X' or 'O' = cell taken by respective player
+        self.board = [[None for _ in range(self.size)] for _ in range(self.size)]
+        self.current_player = 'X'  # X always goes first in traditional rules
         self.winner = None
         self.game_over = False
         self.moves_made = 0
-    
+        # Number of marks each player has on every line
+        self.line_counts = {
+            'X': [0] * len(self.lines),
+            'O': [0] * len(self.lines)
+        }
+        # Static evaluation from X's point of view, see evaluate()
+        self._line_score = 0
+
+    @classmethod
+    def from_game_state(cls, state):
+        """
+        Create a game from a state dictionary.
+
+        Args:
+            state: Dictionary as returned by get_game_state()
+
+        Returns:
+            TicTacToe: New game instance in the given state
+        """
+        game = cls(len(state['board']), state.get('win_length'))
+        for row, cells in enumerate(state['board']):
+            for col, cell in enumerate(cells):
+                if cell is not None:
+                    game._place(row, col, cell)
+        game.current_player = state['current_player']
+        game.winner = state['winner']
+        game.game_over = state['game_over']
+        game.moves_made = state['moves_made']
+        return game
+
+    def copy(self):
+        """
+        Create an independent copy of the game.
+
+        Returns:
+            TicTacToe: New game instance in the same state
+        """
+        game = TicTacToe.__new__(TicTacToe)
+        game.size = self.size
+        game.win_length = self.win_length
+        game.lines = self.lines
+        game._cell_lines = self._cell_lines
+        game.move_order = self.move_order
+        game._weights = self._weights
+        game.board = [row[:] for row in self.board]
+        game.current_player = self.current_player
+        game.winner = self.winner
+        game.game_over = self.game_over
+        game.moves_made = self.moves_made
+        game.line_counts = {
+            'X': self.line_counts['X'][:],
+            'O': self.line_counts['O'][:]
+        }
+        game._line_score = self._line_score
+        return game
+
     def make_move(self, row, col):
         """
         Attempt to make a move at the specified position.
         
         Args:
-            row: Row index (0-2)
-            col: Column index (0-2)
+            row: Row index (0 to size - 1)
+            col: Column index (0 to size - 1)
             
         Returns:
             bool: True if the move was valid and made, False otherwise
         """
         # Check if the move is valid
-        if (not 0 <= row <= 2) or (not 0 <= col <= 2) or \
+        if (not 0 <= row < self.size) or (not 0 <= col < self.size) or \
            self.board[row][col] is not None or self.game_over:
             return False
         
         # Make the move
-        self.board[row][col] = self.current_player
+        won = self._place(row, col, self.current_player)
         self.moves_made += 1
         
         # Check for win or draw
-        if self._check_winner():
+        if won:
             self.winner = self.current_player
             self.game_over = True
-        elif self.moves_made == 9:  # All cells filled
+        elif self.moves_made == self.size * self.size:  # All cells filled
             self.game_over = True
         
         # Switch current player
@@ -63,30 +213,82 @@ class TicTacToe:
         
         return True
     
-    def _check_winner(self):
+    def undo_move(self, row, col):
         """
-        Check if the current state of the board has a winner.
+        Take back the last move, made at the specified position.
         
+        Args:
+            row: Row index of the last move
+            col: Column index of the last move
+            
         Returns:
-            bool: True if there is a winner, False otherwise
+            bool: True if the move was taken back, False if the cell is empty
         """
-        # Check rows
-        for row in range(3):
-            if self.board[row][0] == self.board[row][1] == self.board[row][2] != None:
-                return True
+        player = self.board[row][col]
+        if player is None:
+            return False
         
-        # Check columns
-        for col in range(3):
-            if self.board[0][col] == self.board[1][col] == self.board[2][col] != None:
-                return True
+        self.board[row][col] = None
+        counts = self.line_counts[player]
+        other = self.line_counts['O' if player == 'X' else 'X']
+        weights = self._weights
+        sign = 1 if player == 'X' else -1
+        for index in self._cell_lines[row][col]:
+            count = counts[index]
+            if other[index] == 0:
+                self._line_score -= sign * (weights[count] - weights[count - 1])
+            elif count == 1:
+                # The line becomes open for the other player again
+                self._line_score -= sign * weights[other[index]]
+            counts[index] = count - 1
         
-        # Check diagonals
-        if self.board[0][0] == self.board[1][1] == self.board[2][2] != None:
-            return True
-        if self.board[0][2] == self.board[1][1] == self.board[2][0] != None:
-            return True
+        self.moves_made -= 1
+        self.current_player = player
+        # Moves are only made while the game is running
+        self.winner = None
+        self.game_over = False
+        return True
+    
+    def _place(self, row, col, player):
+        """
+        Put a mark on the board and update the line counters.
         
-        return False
+        Returns:
+            bool: True if the mark completes a line
+        """
+        self.board[row][col] = player
+        counts = self.line_counts[player]
+        other = self.line_counts['O' if player == 'X' else 'X']
+        weights = self._weights
+        sign = 1 if player == 'X' else -1
+        won = False
+        for index in self._cell_lines[row][col]:
+            count = counts[index] + 1
+            counts[index] = count
+            if count == self.win_length:
+                won = True
+            if other[index] == 0:
+                self._line_score += sign * (weights[count] - weights[count - 1])
+            elif count == 1:
+                # The line is no longer open for the other player
+                self._line_score += sign * weights[other[index]]
+        return won
+    
+    def evaluate(self, player):
+        """
+        Static evaluation of the position from a player's point of view.
+        
+        Every line still open for one player (no marks of the other) is worth
+        more the more marks it holds; lines one mark short of a win count the
+        most. The value is kept up to date by make_move and undo_move.
+        
+        Args:
+            player: 'X' or 'O'
+            
+        Returns:
+            int: Positive when the position favours player
+        """
+        return self._line_score if player == 'X' else -self._line_score
     
     def get_available_moves(self):
         """
@@ -96,12 +298,21 @@ class TicTacToe:
             list: List of (row, col) tuples representing empty cells
         """
         moves = []
-        for row in range(3):
-            for col in range(3):
+        for row in range(self.size):
+            for col in range(self.size):
                 if self.board[row][col] is None:
                     moves.append((row, col))
         return moves
     
+    def position_key(self):
+        """
+        Get a hashable key identifying the current position.
+        
+        Returns:
+            tuple: The board cells and the player to move
+        """
+        return (tuple(tuple(row) for row in self.board), self.current_player)
+    
     def get_game_state(self):
         """
         Get a dictionary representing the current game state.
@@ -109,13 +320,79 @@ class TicTacToe:
         Returns:
             dict: Game state information
         """
-        return {
+        state = {
             'board': [row[:] for row in self.board],  # Deep copy
             'current_player': self.current_player,
             'winner': self.winner,
             'game_over': self.game_over,
             'moves_made': self.moves_made
         }
+        if self.win_length != self.size:
+            state['win_length'] = self.win_length
+        return state
+
+
+class TreeSummary:
+    """
+    Aggregate statistics of a decision subtree, reported in place of the
+    nodes that summary trees do not keep.
+    """
+    def __init__(self):
+        self.nodes = 0
+        # Terminal leaves by outcome, from the AI's point of view
+        self.wins = 0
+        self.draws = 0
+        self.losses = 0
+        # Range of the leaf scores
+        self.min_score = None
+        self.max_score = None
+        self.pruned = 0
+    
+    def add_leaf(self, score, outcome=None):
+        """
+        Count a searched leaf.
+        
+        Args:
+            score: Score of the leaf
+            outcome: 'win', 'draw' or 'loss' for the AI, or None for a
+                     position scored at the depth limit
+        """
+        self.nodes += 1
+        if outcome == 'win':
+            self.wins += 1
+        elif outcome == 'draw':
+            self.draws += 1
+        elif outcome == 'loss':
+            self.losses += 1
+        self._add_score_range(score, score)
+    
+    def add(self, other):
+        """Add the statistics of another subtree."""
+        self.nodes += other.nodes
+        self.wins += other.wins
+        self.draws += other.draws
+        self.losses += other.losses
+        self.pruned += other.pruned
+        if other.min_score is not None:
+            self._add_score_range(other.min_score, other.max_score)
+    
+    def _add_score_range(self, low, high):
+        if self.min_score is None or low < self.min_score:
+            self.min_score = low
+        if self.max_score is None or high > self.max_score:
+            self.max_score = high
+    
+    def to_dict(self):
+        """Convert the summary to a dictionary for JSON serialization."""
+        return {
+            'nodes': self.nodes,
+            'wins': self.wins,
+            'draws': self.draws,
+            'losses': self.losses,
+            'minScore': self.min_score,
+            'maxScore': self.max_score,
+            'pruned': self.pruned
+        }
 
 
 class TreeNode:
@@ -131,6 +408,16 @@ class TreeNode:
         self.score = None
         self.pruned = False
         self.isBestMove = False
+        # Summary trees only: TreeSummary of the whole subtree, and of the
+        # children that were collapsed
+        self.summary = None
+        self.collapsed = None
+        # MCTS trees only: number of playouts through the node
+        self.visits = None
+        # Trees over their node budget only: whether the node's children
+        # were dropped, or (spill store, reference) of its spilled children
+        self.truncated = False
+        self.spilled = None
         # Positions will be calculated during visualization
         self.x = 0
         self.y = 0
@@ -139,8 +426,101 @@ class TreeNode:
     def add_child(self, child):
         self.children.append(child)
     
-    def to_dict(self):
-        """Convert the node to a dictionary for JSON serialization."""
+    @classmethod
+    def from_dict(cls, data, parent=None, max_depth=None):
+        """
+        Rebuild a subtree serialized by to_dict().
+        
+        Best-move marks are not restored; see mark_best_path.
+        
+        Args:
+            data: Dictionary returned by to_dict()
+            parent: Parent of the rebuilt node
+            max_depth: Number of levels below the node to rebuild, or None
+                       to rebuild the whole subtree
+        """
+        move = tuple(data['move']) if data['move'] is not None else None
+        node = cls(data['board'], data['isMaximizing'], move, parent)
+        node.score = data['score']
+        node.pruned = data['pruned']
+        if max_depth is None or max_depth > 0:
+            child_depth = None if max_depth is None else max_depth - 1
+            node.children = [cls.from_dict(child, node, child_depth)
+                             for child in data.get('children', [])]
+        return node
+    
+    def mark_best_path(self):
+        """Mark the path of the best move through the subtree."""
+        if not self.children:
+            return
+        
+        best_child = None
+        best_score = float('-inf') if self.isMaximizing else float('inf')
+        
+        for child in self.children:
+            if child.pruned:
+                continue
+            
+            if self.isMaximizing:
+                if child.score > best_score:
+                    best_score = child.score
+                    best_child = child
+            else:
+                if child.score < best_score:
+                    best_score = child.score
+                    best_child = child
+        
+        if best_child:
+            best_child.isBestMove = True
+            best_child.mark_best_path()
+    
+    def release_children(self):
+        """
+        Drop the node's subtree.
+        
+        The parent links are cleared so that the nodes are freed right away
+        instead of waiting for the cycle collector.
+        """
+        stack = self.children
+        self.children = []
+        while stack:
+            node = stack.pop()
+            node.parent = None
+            stack.extend(node.children)
+    
+    def spill(self, store):
+        """Move the node's finished subtree to a SpillStore."""
+        self.spilled = (store, store.write([child.to_dict() for child in self.children]))
+        self.release_children()
+    
+    def _spilled_children(self, max_depth=None):
+        """
+        Read the spilled children back as TreeNodes.
+        
+        The stored JSON is read whole, but only the levels that will be
+        serialized are rebuilt. The subtree was spilled before the best path
+        was known, so it is marked here when this node lies on the best path.
+        
+        Args:
+            max_depth: Number of levels below the children to rebuild, or
+                       None to rebuild the whole subtree
+        """
+        store, ref = self.spilled
+        children = [TreeNode.from_dict(child, self, max_depth) for child in store.read(ref)]
+        if self.isBestMove:
+            holder = TreeNode(self.board, self.isMaximizing)
+            holder.children = children
+            holder.mark_best_path()
+        return children
+    
+    def to_dict(self, max_depth=None):
+        """
+        Convert the node to a dictionary for JSON serialization.
+        
+        Args:
+            max_depth: Number of levels below this node to include,
+                       or None to include the whole subtree
+        """
         result = {
             'board': self.board,
             'isMaximizing': self.isMaximizing,
@@ -150,10 +530,90 @@ class TreeNode:
             'move': self.move
         }
         
-        if self.children:
-            result['children'] = [child.to_dict() for child in self.children]
+        if max_depth is None or max_depth > 0:
+            child_depth = None if max_depth is None else max_depth - 1
+            children = (self.children if self.spilled is None
+                        else self._spilled_children(child_depth))
+            if children:
+                result['children'] = [child.to_dict(child_depth) for child in children]
+        
+        if self.truncated:
+            result['truncated'] = True
+        if self.summary is not None:
+            result['summary'] = self.summary.to_dict()
+        if self.collapsed is not None:
+            result['collapsed'] = self.collapsed.to_dict()
+        if self.visits is not None:
+            result['visits'] = self.visits
         
         return result
+    
+    def to_dag(self, max_depth=None):
+        """
+        Convert the subtree to a DAG for JSON serialization.
+        
+        Identical subtrees, such as a position reached through different move
+        orders, are emitted once and referenced from every parent. The move,
+        best-move marking and pruned flag depend on how a node was reached,
+        so they are kept on the edges rather than on the nodes.
+        
+        Args:
+            max_depth: Number of levels below this node to include,
+                       or None to include the whole subtree
+        
+        Returns:
+            tuple: (nodes, root index) where nodes is a list of dicts with
+                   'board', 'isMaximizing', 'score' and, if the node has
+                   any, 'children': a list of edges with 'node' (index into
+                   nodes), 'move', 'isBestMove' and 'pruned'
+        """
+        nodes = []
+        root = self._intern(max_depth, nodes, {})
+        return nodes, root
+    
+    def _intern(self, max_depth, nodes, index):
+        """
+        Add the subtree to a DAG under construction.
+        
+        Args:
+            max_depth: Number of levels below this node to include, or None
+            nodes: Node list of the DAG, children before their parents
+            index: Dict mapping node contents to their index in nodes
+            
+        Returns:
+            int: Index of this node in nodes
+        """
+        edges = []
+        if max_depth is None or max_depth > 0:
+            child_depth = None if max_depth is None else max_depth - 1
+            children = (self.children if self.spilled is None
+                        else self._spilled_children(child_depth))
+            for child in children:
+                edges.append((child._intern(child_depth, nodes, index), child.move,
+                              child.isBestMove, child.pruned))
+        
+        key = (tuple(tuple(row) for row in self.board), self.isMaximizing,
+               self.score, self.visits, self.truncated, tuple(edges))
+        node_index = index.get(key)
+        if node_index is None:
+            node_index = len(nodes)
+            index[key] = node_index
+            node = {
+                'board': self.board,
+                'isMaximizing': self.isMaximizing,
+                'score': self.score
+            }
+            if self.visits is not None:
+                node['visits'] = self.visits
+            if self.truncated:
+                node['truncated'] = True
+            if edges:
+                node['children'] = [
+                    {'node': child, 'move': move, 'isBestMove': is_best, 'pruned': pruned}
+                    for child, move, is_best, pruned in edges
+                ]
+            nodes.append(node)
+        return node_index
 
 
 class TicTacToeAI:
@@ -176,6 +636,37 @@ class TicTacToeAI:
         # Root of the decision tree for visualization
         self.decision_tree = None
         self.max_depth_seen = 0
+        # Optional callable(nodes_explored, best_move) for live search progress,
+        # called every progress_interval nodes
+        self.progress_callback = None
+        self.progress_interval = 1000
+        # Best root move found so far by the running search
+        self.current_best_move = None
+        # Optional threading.Event; the search stops with SearchCancelled
+        # soon after it is set
+        self.cancel_event = None
+        # Optional number of lines to keep at every node. When set, the tree
+        # is summarized during the search, see _summarize
+        self.summary_top_k = None
+        # Optional number of plies to look ahead. Positions at the limit are
+        # scored with the static evaluation instead of being searched further
+        # (needed on boards larger than 3x3).
+        self.depth_limit = None
+        # Optional maximum number of tree nodes to record. Past it, nodes
+        # tree_cutoff_depth levels below the root release their subtrees as
+        # they finish: 'truncate' drops them, 'spill' moves them to a
+        # temporary file read back when the tree is serialized. The search
+        # itself is unaffected.
+        self.tree_budget = None
+        self.tree_capture = 'truncate'
+        self.tree_cutoff_depth = 3
+        # Nodes recorded so far, and nodes whose subtrees were released
+        self.tree_nodes = 0
+        self.released_nodes = 0
+        self._spill_store = None
+        # Optional shared_table.SharedTranspositionTable consulted by the
+        # analysis search, shared with the AIs of other processes
+        self.shared_table = None
     
     def get_best_move(self, game, use_alpha_beta=True):
         """
@@ -193,6 +684,10 @@ class TicTacToeAI:
         self.nodes_explored = 0
         self.decision_tree = None
         self.max_depth_seen = 0
+        self.current_best_move = None
+        self.tree_nodes = 0
+        self.released_nodes = 0
+        self._spill_store = None
         
         available_moves = game.get_available_moves()
         
@@ -202,13 +697,7 @@ class TicTacToeAI:
         # For the first move as 'O', a common strategy is to take the center
         # if it's available or a corner if the center is taken
         if game.moves_made <= 1 and self.player == 'O':
-            # Try to take center
-            if (1, 1) in available_moves:
-                return (1, 1)
-            # Otherwise take a corner
-            for corner in [(0, 0), (0, 2), (2, 0), (2, 2)]:
-                if corner in available_moves:
-                    return corner
+            return self._order_moves(available_moves, game)[0]
         
         best_score = float('-inf')
         best_move = available_moves[0]  # Default to first available move
@@ -225,10 +714,15 @@ class TicTacToeAI:
         # Initialize nodes_explored to 1 for the root node
         self.nodes_explored = 1
         
-        # Create a copy of the game to simulate moves
+        # Create a copy of the game to simulate moves on; the searches make
+        # and undo moves on it in place
+        game = self._copy_game(game)
         for move in available_moves:
             row, col = move
             
+            # Simulate the move
+            game.make_move(row, col)
+            
             # Create a child node for this move
             child_node = TreeNode(
                 [row[:] for row in game.board],
@@ -238,21 +732,15 @@ class TicTacToeAI:
             )
             root_node.add_child(child_node)
             
-            # Simulate the move
-            game_copy = self._copy_game(game)
-            game_copy.make_move(row, col)
-            
-            # Update the child's board with the move
-            child_node.board = [row[:] for row in game_copy.board]
-            
             # Increment nodes_explored for the child node
             self.nodes_explored += 1
             
             # Calculate score for this move
             if use_alpha_beta:
-                score = self._minimax_alpha_beta(game_copy, 0, False, float('-inf'), float('inf'), child_node)
+                score = self._minimax_alpha_beta(game, 0, False, float('-inf'), float('inf'), child_node)
             else:
-                score = self._minimax(game_copy, 0, False, child_node)
+                score = self._minimax(game, 0, False, child_node)
+            game.undo_move(row, col)
             
             # Update the child's score
             child_node.score = score
@@ -261,51 +749,132 @@ class TicTacToeAI:
             if score > best_score:
                 best_score = score
                 best_move = move
+                self.current_best_move = move
+            
+            self._report_progress()
+        
+        if self.summary_top_k:
+            self._summarize(root_node, game)
         
         # Mark the best move in the tree
         for child in root_node.children:
             if child.move == best_move:
                 child.isBestMove = True
-                self._mark_best_path(child)
+                child.mark_best_path()
                 break
         
         return best_move
     
-    def _mark_best_path(self, node):
-        """Mark the path of the best move through the tree."""
+    def _report_progress(self):
+        """Send the search progress to the progress callback, if any."""
+        if self.progress_callback:
+            self.progress_callback(self.nodes_explored, self.current_best_move)
+    
+    def _check_interval(self):
+        """Periodic work during a search: report progress and honor cancellation."""
+        self._report_progress()
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise SearchCancelled("Search cancelled")
+    
+    def _finish_node(self, node, game, depth):
+        """
+        Called for every node below the root as soon as its score is final:
+        summarize it, or keep the tree within its node budget.
+        """
+        if self.summary_top_k:
+            self._summarize(node, game)
+        elif self.tree_budget is not None and node.children:
+            self._limit_tree(node, depth)
+    
+    def _limit_tree(self, node, depth):
+        """
+        Keep the recorded tree within tree_budget nodes.
+        
+        Until the budget is reached, finished nodes keep their children.
+        After that, a node finishing tree_cutoff_depth levels below the
+        root releases its subtree: with 'truncate' the children are dropped
+        and the node is marked truncated (deeper nodes drop theirs too, so
+        they are freed sooner); with 'spill' the subtree is written to the
+        spill store as a whole.
+        
+        Args:
+            node: TreeNode whose score is final
+            depth: The node's depth, as passed to the search
+        """
+        level = depth + 1
+        if self.tree_nodes < self.tree_budget or level < self.tree_cutoff_depth:
+            self.tree_nodes += len(node.children)
+        elif self.tree_capture == 'spill':
+            # Deeper nodes are spilled with their ancestor at the cutoff
+            if level == self.tree_cutoff_depth:
+                if self._spill_store is None:
+                    self._spill_store = SpillStore()
+                node.spill(self._spill_store)
+                self.released_nodes += 1
+        else:
+            node.release_children()
+            node.truncated = True
+            self.released_nodes += 1
+    
+    def _summarize(self, node, game):
+        """
+        Aggregate a finished node's subtree and collapse all but its best lines.
+        
+        Called for every node as soon as its score is final, so the children
+        are already summarized. Only the best child keeps its own subtree;
+        the next best summary_top_k - 1 children are kept without theirs, and
+        the remaining and pruned children are merged into node.collapsed.
+        Applied bottom-up, this leaves the principal variation with the top
+        alternatives at each of its nodes, and frees everything else while
+        the search is still running.
+        
+        Args:
+            node: TreeNode whose score is final
+            game: TicTacToe instance in the node's position
+        """
+        summary = TreeSummary()
         if not node.children:
+            outcome = None
+            if game.game_over:
+                outcome = {10: 'win', -10: 'loss'}.get(self._evaluate_board(game), 'draw')
+            summary.add_leaf(node.score, outcome)
+            node.summary = summary
             return
-            
-        best_child = None
-        best_score = float('-inf') if node.isMaximizing else float('inf')
         
+        summary.nodes = 1
+        searched = []
         for child in node.children:
             if child.pruned:
-                continue
-                
-            if node.isMaximizing:
-                if child.score > best_score:
-                    best_score = child.score
-                    best_child = child
+                summary.pruned += 1
             else:
-                if child.score < best_score:
-                    best_score = child.score
-                    best_child = child
+                summary.add(child.summary)
+                searched.append(child)
+        node.summary = summary
         
-        if best_child:
-            best_child.isBestMove = True
-            self._mark_best_path(best_child)
+        # Best first; the sort is stable, so ties keep the search order
+        # and the first best child stays the best as in mark_best_path
+        searched.sort(key=lambda child: child.score, reverse=node.isMaximizing)
+        kept = searched[:self.summary_top_k]
+        for child in kept[1:]:
+            child.children = []
+        
+        kept_ids = {id(child) for child in kept}
+        collapsed = TreeSummary()
+        children = []
+        for child in node.children:
+            if id(child) in kept_ids:
+                children.append(child)
+            elif child.pruned:
+                collapsed.pruned += 1
+            else:
+                collapsed.add(child.summary)
+        node.children = children
+        if collapsed.nodes or collapsed.pruned:
+            node.collapsed = collapsed
     
     def _copy_game(self, game):
         """Create a deep copy of the game state for simulation."""
-        new_game = TicTacToe()
-        state = game.get_game_state()
-        new_game.board = state['board']
-        new_game.current_player = state['current_player']
-        new_game.winner = state['winner']
-        new_game.game_over = state['game_over']
-        new_game.moves_made = state['moves_made']
-        return new_game
+        return game.copy()
     
     def _evaluate_board(self, game):
         """
@@ -327,6 +896,27 @@ class TicTacToeAI:
         else:
             return 0
     
+    def _heuristic_score(self, game):
+        """
+        Score a non-terminal position at the depth limit.
+        
+        Uses the game's static evaluation, scaled to lie strictly between
+        the scores of a loss and a win so a forced result always outweighs
+        it. Scaling rather than clamping keeps strong positions apart.
+        
+        Args:
+            game: TicTacToe instance
+            
+        Returns:
+            float: Score between -9 and 9
+        """
+        return 9 * game.evaluate(self.player) / _max_evaluation(game.size, game.win_length)
+    
+    def _at_depth_limit(self, depth):
+        """Whether a node at this depth is scored without searching further."""
+        # depth counts the plies below the root's children
+        return self.depth_limit is not None and depth + 1 >= self.depth_limit
+    
     def _minimax(self, game, depth, is_maximizing, node):
         """
         Standard Minimax algorithm implementation with tree tracking.
@@ -343,11 +933,20 @@ class TicTacToeAI:
         # FIX: Only increment the counter, never decrement
         self.nodes_explored += 1
         self.max_depth_seen = max(self.max_depth_seen, depth)
+        if self.nodes_explored % self.progress_interval == 0:
+            self._check_interval()
         
         # Terminal state check
         if game.game_over:
             score = self._evaluate_board(game)
             node.score = score
+            self._finish_node(node, game, depth)
+            return score
+        
+        if self._at_depth_limit(depth):
+            score = self._heuristic_score(game)
+            node.score = score
+            self._finish_node(node, game, depth)
             return score
         
         available_moves = game.get_available_moves()
@@ -357,6 +956,8 @@ class TicTacToeAI:
             for move in available_moves:
                 row, col = move
                 
+                game.make_move(row, col)
+                
                 # Create a child node
                 child_node = TreeNode(
                     [row[:] for row in game.board],
@@ -366,23 +967,21 @@ class TicTacToeAI:
                 )
                 node.add_child(child_node)
                 
-                game_copy = self._copy_game(game)
-                game_copy.make_move(row, col)
-                
-                # Update the child's board with the move
-                child_node.board = [row[:] for row in game_copy.board]
-                
-                score = self._minimax(game_copy, depth + 1, False, child_node)
+                score = self._minimax(game, depth + 1, False, child_node)
+                game.undo_move(row, col)
                 child_node.score = score
                 best_score = max(score, best_score)
                 
             node.score = best_score
+            self._finish_node(node, game, depth)
             return best_score
         else:
             best_score = float('inf')
             for move in available_moves:
                 row, col = move
                 
+                game.make_move(row, col)
+                
                 # Create a child node
                 child_node = TreeNode(
                     [row[:] for row in game.board],
@@ -392,17 +991,13 @@ class TicTacToeAI:
                 )
                 node.add_child(child_node)
                 
-                game_copy = self._copy_game(game)
-                game_copy.make_move(row, col)
-                
-                # Update the child's board with the move
-                child_node.board = [row[:] for row in game_copy.board]
-                
-                score = self._minimax(game_copy, depth + 1, True, child_node)
+                score = self._minimax(game, depth + 1, True, child_node)
+                game.undo_move(row, col)
                 child_node.score = score
                 best_score = min(score, best_score)
                 
             node.score = best_score
+            self._finish_node(node, game, depth)
             return best_score
     
     def _minimax_alpha_beta(self, game, depth, is_maximizing, alpha, beta, node):
@@ -423,37 +1018,35 @@ class TicTacToeAI:
         # FIX: Only increment the counter, never decrement
         self.nodes_explored += 1
         self.max_depth_seen = max(self.max_depth_seen, depth)
+        if self.nodes_explored % self.progress_interval == 0:
+            self._check_interval()
         
         # Terminal state check
         if game.game_over:
             score = self._evaluate_board(game)
             node.score = score
+            self._finish_node(node, game, depth)
+            return score
+        
+        if self._at_depth_limit(depth):
+            score = self._heuristic_score(game)
+            node.score = score
+            self._finish_node(node, game, depth)
             return score
         
         available_moves = game.get_available_moves()
         
         # Consider center and corners first for better pruning
         if depth == 0:
-            # Order moves: center, corners, then edges for better pruning
-            ordered_moves = []
-            # First center
-            if (1, 1) in available_moves:
-                ordered_moves.append((1, 1))
-            # Then corners
-            for move in [(0, 0), (0, 2), (2, 0), (2, 2)]:
-                if move in available_moves and move not in ordered_moves:
-                    ordered_moves.append(move)
-            # Then edges
-            for move in [(0, 1), (1, 0), (1, 2), (2, 1)]:
-                if move in available_moves and move not in ordered_moves:
-                    ordered_moves.append(move)
-            available_moves = ordered_moves
+            available_moves = self._order_moves(available_moves, game)
         
         if is_maximizing:
             best_score = float('-inf')
             for move in available_moves:
                 row, col = move
                 
+                game.make_move(row, col)
+                
                 # Create a child node
                 child_node = TreeNode(
                     [row[:] for row in game.board],
@@ -463,13 +1056,8 @@ class TicTacToeAI:
                 )
                 node.add_child(child_node)
                 
-                game_copy = self._copy_game(game)
-                game_copy.make_move(row, col)
-                
-                # Update the child's board with the move
-                child_node.board = [row[:] for row in game_copy.board]
-                
-                score = self._minimax_alpha_beta(game_copy, depth + 1, False, alpha, beta, child_node)
+                score = self._minimax_alpha_beta(game, depth + 1, False, alpha, beta, child_node)
+                game.undo_move(row, col)
                 child_node.score = score
                 best_score = max(score, best_score)
                 alpha = max(alpha, best_score)
@@ -489,12 +1077,15 @@ class TicTacToeAI:
                     break  # Beta cutoff
                     
             node.score = best_score
+            self._finish_node(node, game, depth)
             return best_score
         else:
             best_score = float('inf')
             for move in available_moves:
                 row, col = move
                 
+                game.make_move(row, col)
+                
                 # Create a child node
                 child_node = TreeNode(
                     [row[:] for row in game.board],
@@ -504,13 +1095,8 @@ class TicTacToeAI:
                 )
                 node.add_child(child_node)
                 
-                game_copy = self._copy_game(game)
-                game_copy.make_move(row, col)
-                
-                # Update the child's board with the move
-                child_node.board = [row[:] for row in game_copy.board]
-                
-                score = self._minimax_alpha_beta(game_copy, depth + 1, True, alpha, beta, child_node)
+                score = self._minimax_alpha_beta(game, depth + 1, True, alpha, beta, child_node)
+                game.undo_move(row, col)
                 child_node.score = score
                 best_score = min(score, best_score)
                 beta = min(beta, best_score)
@@ -530,22 +1116,257 @@ class TicTacToeAI:
                     break  # Alpha cutoff
                     
             node.score = best_score
+            self._finish_node(node, game, depth)
             return best_score
     
-    def get_decision_tree(self):
+    def _order_moves(self, available_moves, game):
+        """
+        Order moves by the number of lines through them for better pruning.
+        
+        On the 3x3 board this is center first, then corners, then edges.
+        
+        Args:
+            available_moves: List of (row, col) tuples
+            game: TicTacToe instance the moves belong to
+            
+        Returns:
+            list: The same moves in search order
+        """
+        available = set(available_moves)
+        return [move for move in game.move_order if move in available]
+    
+    def analyze(self, game, top_k=None):
+        """
+        Get exact scores and principal variations for the best moves (multi-PV).
+        
+        All root moves are searched in one pass that shares a transposition
+        table, so positions reached through different root moves are only
+        solved once. A move only needs an exact score while it can still
+        reach the top K; otherwise a cheaper bound proves it cannot.
+        
+        Args:
+            game: TicTacToe instance
+            top_k: Number of moves to return, or None for all legal moves
+            
+        Returns:
+            list: Dicts with 'move', 'score' and 'pv' (list of moves starting
+                  with 'move'), best move first
+        """
+        self.nodes_explored = 0
+        self.current_best_move = None
+        
+        available_moves = self._order_moves(game.get_available_moves(), game)
+        if game.game_over or not available_moves:
+            return []
+        game = self._copy_game(game)
+        
+        top_k = len(available_moves) if top_k is None else max(1, min(top_k, len(available_moves)))
+        table = {}
+        lines = []
+        exact_scores = []
+        
+        for move in available_moves:
+            # Anything scoring below the current K-th best score is out
+            if len(exact_scores) >= top_k:
+                floor = sorted(exact_scores, reverse=True)[top_k - 1] - 1
+            else:
+                floor = float('-inf')
+            
+            game.make_move(*move)
+            score = self._analysis_search(game, False, floor, float('inf'), table)
+            
+            # At or below the floor the score is only an upper bound
+            if score > floor:
+                exact_scores.append(score)
+                lines.append({
+                    'move': move,
+                    'score': score,
+                    'pv': [move] + self._principal_variation(game, table)
+                })
+                if self.current_best_move is None or score > max(exact_scores[:-1]):
+                    self.current_best_move = move
+            game.undo_move(*move)
+            
+            self._report_progress()
+        
+        lines.sort(key=lambda line: line['score'], reverse=True)
+        return lines[:top_k]
+    
+    def _analysis_search(self, game, is_maximizing, alpha, beta, table):
+        """
+        Minimax with Alpha-Beta pruning and a transposition table, without
+        tree tracking.
+        
+        Args:
+            game: TicTacToe instance
+            is_maximizing: Whether this is a maximizing or minimizing node
+            alpha: Alpha value for pruning
+            beta: Beta value for pruning
+            table: Transposition table mapping position keys to
+                   (score, bound type, best move)
+            
+        Returns:
+            int: Score of the position, exact if it lies between alpha and beta
+        """
+        self.nodes_explored += 1
+        if self.nodes_explored % self.progress_interval == 0:
+            self._check_interval()
+        
+        if game.game_over:
+            return self._evaluate_board(game)
+        
+        key = game.position_key()
+        entry = table.get(key)
+        if entry is None and self.shared_table is not None:
+            entry = self._shared_lookup(game)
+            if entry is not None:
+                table[key] = entry
+        available_moves = self._order_moves(game.get_available_moves(), game)
+        
+        if entry is not None:
+            score, bound, best_move = entry
+            if bound == EXACT:
+                return score
+            if bound == LOWER_BOUND:
+                alpha = max(alpha, score)
+            else:
+                beta = min(beta, score)
+            if alpha >= beta:
+                return score
+            # Try the move that was best last time first
+            if best_move in available_moves:
+                available_moves.remove(best_move)
+                available_moves.insert(0, best_move)
+        
+        original_alpha, original_beta = alpha, beta
+        start_nodes = self.nodes_explored
+        best_score = float('-inf') if is_maximizing else float('inf')
+        best_move = None
+        
+        for move in available_moves:
+            game.make_move(*move)
+            score = self._analysis_search(game, not is_maximizing, alpha, beta, table)
+            game.undo_move(*move)
+            
+            if is_maximizing:
+                if score > best_score:
+                    best_score, best_move = score, move
+                alpha = max(alpha, best_score)
+            else:
+                if score < best_score:
+                    best_score, best_move = score, move
+                beta = min(beta, best_score)
+            
+            if beta <= alpha:
+                break
+        
+        if best_score <= original_alpha:
+            bound = UPPER_BOUND
+        elif best_score >= original_beta:
+            bound = LOWER_BOUND
+        else:
+            bound = EXACT
+        table[key] = (best_score, bound, best_move)
+        if self.shared_table is not None:
+            self._shared_store(game, best_score, bound, best_move,
+                               self.nodes_explored - start_nodes)
+        return best_score
+    
+    def _shared_lookup(self, game):
+        """
+        Look up a position in the shared transposition table.
+        
+        Returns:
+            tuple: (score, bound type, best move) from the AI's point of
+                   view, or None if the position is not in the table
+        """
+        entry = self.shared_table.lookup(game)
+        if entry is None:
+            return None
+        score, bound, cell = entry
+        move = divmod(cell, game.size) if cell is not None else None
+        # The shared table scores positions for X
+        if self.player == 'X':
+            return score, bound, move
+        return -score, FLIPPED_BOUNDS[bound], move
+    
+    def _shared_store(self, game, score, bound, move, work):
+        """Store a search result in the shared transposition table."""
+        cell = move[0] * game.size + move[1] if move is not None else None
+        if self.player != 'X':
+            score, bound = -score, FLIPPED_BOUNDS[bound]
+        self.shared_table.store(game, score, bound, cell, work)
+    
+    def _principal_variation(self, game, table):
+        """
+        Follow the best moves stored in the transposition table.
+        
+        Positions the search answered from the shared table have no local
+        entry, so their moves are taken from the shared table.
+        
+        Returns:
+            list: Moves of the principal variation from this position
+        """
+        pv = []
+        game = self._copy_game(game)
+        while not game.game_over:
+            entry = table.get(game.position_key())
+            if entry is None and self.shared_table is not None:
+                entry = self._shared_lookup(game)
+            # A hash collision in the shared table can give an illegal move
+            if entry is None or entry[2] is None or not game.make_move(*entry[2]):
+                break
+            pv.append(entry[2])
+        return pv
+    
+    def get_decision_tree(self, max_depth=None, tree_format='tree'):
         """
         Get the decision tree for visualization.
         
+        Args:
+            max_depth: Deepest level to include, or None for the whole tree
+            tree_format: 'tree' for nested nodes, or 'dag' to emit repeated
+                         subtrees once (see TreeNode.to_dag), which is much
+                         smaller for plain minimax. Trees summarized during
+                         the search (summary_top_k) are always nested.
+            
         Returns:
             dict: Tree data in a format suitable for frontend visualization
         """
         if not self.decision_tree:
             return None
-            
-        return {
-            'root': self.decision_tree.to_dict(),
-            'maxDepth': self.max_depth_seen
-        }
+        
+        if self.summary_top_k:
+            return {
+                'format': 'summary',
+                'root': self.decision_tree.to_dict(max_depth),
+                'maxDepth': self.max_depth_seen,
+                'topK': self.summary_top_k
+            }
+        
+        if tree_format == 'dag':
+            nodes, root = self.decision_tree.to_dag(max_depth)
+            tree = {
+                'format': 'dag',
+                'root': root,
+                'nodes': nodes,
+                'maxDepth': self.max_depth_seen
+            }
+        else:
+            tree = {
+                'root': self.decision_tree.to_dict(max_depth),
+                'maxDepth': self.max_depth_seen
+            }
+        
+        if self.tree_budget is not None:
+            tree['capture'] = {
+                # 'full' unless some subtree had to be released
+                'mode': self.tree_capture if self.released_nodes else 'full',
+                'nodeBudget': self.tree_budget,
+                'cutoffDepth': self.tree_cutoff_depth,
+                'releasedNodes': self.released_nodes
+            }
+        return tree
 
 
 # Simple text-based console implementation for testing
@@ -0,0 +1,101 @@
+"""
+TicTacMaster - Game Store
+
+Keeps the games served by the API. Each game lives in a GameSession with
+its own lock, so requests for different games never wait on each other.
+"""
+import threading
+from collections import OrderedDict
+from game import TicTacToe
+
+# Game used by clients that do not send a game_id
+DEFAULT_GAME_ID = 'default'
+
+
+class GameSession:
+    """
+    A game together with the state needed to serve it concurrently.
+    """
+
+    def __init__(self, game_id):
+        self.game_id = game_id
+        self.game = TicTacToe()
+        # Held by every change to the game. It is never held during a
+        # search, so it is only ever held briefly.
+        self.lock = threading.RLock()
+        # Latest published game state. Readers use it without taking the
+        # lock, so they are never blocked by a turn in progress.
+        self.state = self.game.get_game_state()
+        # Incremented by every publish(), so that a change made with the
+        # state of a search can tell whether the game changed meanwhile
+        self.version = 0
+        # Whether a combined human + AI turn is waiting for its search.
+        # Other moves are refused until it is over.
+        self.turn_in_progress = False
+        # Search results precomputed by pondering, keyed by ponder.search_key
+        self.search_cache = {}
+        # Pondering searches in flight (ponder.PonderJob), if any
+        self.ponder_job = None
+        # MCTS engines by player, kept so their trees carry over to the
+        # next move of this game
+        self.mcts_engines = {}
+
+    def publish(self):
+        """Publish the current game state. Call with the lock held."""
+        self.state = self.game.get_game_state()
+        self.version += 1
+
+    def restore(self, state):
+        """Roll the game back to an earlier state. Call with the lock held."""
+        self.game = TicTacToe.from_game_state(state)
+        self.publish()
+
+
+class GameStore:
+    """
+    Bounded collection of game sessions, evicting the least recently used.
+    """
+
+    def __init__(self, max_games=1000, on_evict=None):
+        """
+        Initialize the store.
+
+        Args:
+            max_games: Number of games kept before the oldest is evicted
+            on_evict: Optional callable(session) run for every evicted session
+        """
+        self.max_games = max_games
+        self.on_evict = on_evict
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, game_id=DEFAULT_GAME_ID):
+        """
+        Get a game session, creating it if it does not exist.
+
+        Args:
+            game_id: Identifier of the game
+
+        Returns:
+            GameSession: The session for game_id
+        """
+        game_id = str(game_id or DEFAULT_GAME_ID)
+        evicted = []
+        with self._lock:
+            session = self._sessions.get(game_id)
+            if session is None:
+                session = GameSession(game_id)
+                self._sessions[game_id] = session
+                while len(self._sessions) > self.max_games:
+                    evicted.append(self._sessions.popitem(last=False)[1])
+            else:
+                self._sessions.move_to_end(game_id)
+
+        if self.on_evict:
+            for old_session in evicted:
+                self.on_evict(old_session)
+        return session
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
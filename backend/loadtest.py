@@ -0,0 +1,413 @@
+"""
+TicTacMaster - Load Test
+
+Replays realistic game flows against the API from many simulated clients,
+entirely on localhost, and reports throughput, latency percentiles per
+route, error rates and the server's memory use. Scenarios are JSON files
+in loadtest_scenarios/, so server modes and engine changes can be compared
+like for like:
+
+    python loadtest.py loadtest_scenarios/human_vs_ai.json --server flask
+    python loadtest.py loadtest_scenarios/human_vs_ai.json --server asgi --output asgi.json
+    python loadtest.py loadtest_scenarios/tree_heavy.json --url http://localhost:5001 --server-pid 1234
+
+Scenario format:
+    {
+        "name": "human_vs_ai",
+        "clients": 10,             # simulated clients, each playing its own game
+        "duration_s": 30,          # how long to run
+        "rate_per_client": 2.0,    # requests per second per client, 0 for no pacing
+        "flows": [                 # a client picks a flow per game, by weight
+            {
+                "weight": 1,
+                "use_alpha_beta": true,
+                "include_tree": true,  # only used by play_turn
+                "setup": ["reset"],    # steps run once per game
+                "turn": ["make_move", "ai_make_move", "decision_tree"]
+            }
+        ]
+    }
+
+The turn steps repeat until the game is over. Available steps: reset,
+make_move, ai_make_move, play_turn, decision_tree, analysis, game_state.
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import signal
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Commands used by --server to start a local server
+SERVER_COMMANDS = {
+    'flask': [sys.executable, 'api.py'],
+    'asgi': [sys.executable, 'asgi.py']
+}
+
+
+class LoadStats:
+    """
+    Thread-safe collection of request latencies and errors per route.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.status_codes = {}
+
+    def record(self, route, latency_ms, status):
+        """Record one request. status is the HTTP status, or None on a connection error."""
+        with self._lock:
+            self.latencies.setdefault(route, []).append(latency_ms)
+            key = str(status)
+            self.status_codes[key] = self.status_codes.get(key, 0) + 1
+            if status is None or status >= 400:
+                self.errors[route] = self.errors.get(route, 0) + 1
+
+    def report(self, elapsed_s):
+        """
+        Summarize the recorded requests.
+
+        Returns:
+            dict: Overall throughput and per-route latency percentiles and error rates
+        """
+        with self._lock:
+            routes = {}
+            total = 0
+            total_errors = 0
+            for route, latencies in sorted(self.latencies.items()):
+                latencies = sorted(latencies)
+                errors = self.errors.get(route, 0)
+                total += len(latencies)
+                total_errors += errors
+                routes[route] = {
+                    'requests': len(latencies),
+                    'errors': errors,
+                    'error_rate': errors / len(latencies),
+                    'p50_ms': percentile(latencies, 50),
+                    'p95_ms': percentile(latencies, 95),
+                    'p99_ms': percentile(latencies, 99),
+                    'max_ms': latencies[-1]
+                }
+            return {
+                'requests': total,
+                'errors': total_errors,
+                'error_rate': total_errors / total if total else 0.0,
+                'throughput_rps': total / elapsed_s if elapsed_s else 0.0,
+                'status_codes': dict(self.status_codes),
+                'routes': routes
+            }
+
+
+def percentile(sorted_values, pct):
+    """Get a percentile of an already sorted list (nearest rank)."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class SimulatedClient(threading.Thread):
+    """
+    A client playing games against the server until the test ends.
+    """
+
+    def __init__(self, client_id, url, scenario, stats, stop_event, seed):
+        super().__init__(daemon=True)
+        self.client_id = client_id
+        self.game_id = f"loadtest-{client_id}"
+        parsed = urlparse(url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.scenario = scenario
+        self.stats = stats
+        self.stop_event = stop_event
+        self.random = random.Random(seed)
+        self.connection = None
+        self.game_state = None
+        rate = scenario.get('rate_per_client', 0)
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_request_time = time.perf_counter()
+
+    def run(self):
+        flows = self.scenario['flows']
+        weights = [flow.get('weight', 1) for flow in flows]
+        while not self.stop_event.is_set():
+            flow = self.random.choices(flows, weights)[0]
+            self.play_game(flow)
+        if self.connection:
+            self.connection.close()
+
+    def play_game(self, flow):
+        """Run one game following a flow."""
+        self.game_state = None
+        for step in flow.get('setup', ['reset']):
+            if not self.step(step, flow):
+                return
+
+        while not self.stop_event.is_set():
+            for step in flow['turn']:
+                if self.stop_event.is_set() or not self.step(step, flow):
+                    return
+                if self.game_state and self.game_state['game_over']:
+                    return
+
+    def step(self, step, flow):
+        """
+        Run one step of a flow.
+
+        Returns:
+            bool: Whether the game can continue
+        """
+        use_alpha_beta = flow.get('use_alpha_beta', True)
+        body = {'game_id': self.game_id}
+
+        if step == 'reset':
+            response = self.request('POST', '/api/reset', body)
+            self.game_state = None
+            return response is not None
+        if step == 'game_state':
+            return self.request('GET', f"/api/game_state?game_id={self.game_id}") is not None
+        if step == 'decision_tree':
+            body.update(use_alpha_beta=use_alpha_beta)
+            return self.request('POST', '/api/decision_tree', body) is not None
+        if step == 'analysis':
+            return self.request('POST', '/api/analysis', body) is not None
+        if step == 'ai_make_move':
+            if self.game_state and self.game_state['current_player'] != 'O':
+                return True
+            body.update(use_alpha_beta=use_alpha_beta, player='O')
+            return self.update_state(self.request('POST', '/api/ai_make_move', body))
+        if step in ('make_move', 'play_turn'):
+            if self.game_state and self.game_state['current_player'] != 'X':
+                return True
+            row, col = self.random_move()
+            body.update(row=row, col=col)
+            if step == 'play_turn':
+                body.update(use_alpha_beta=use_alpha_beta, player='O',
+                            include_tree=flow.get('include_tree', False))
+            return self.update_state(self.request('POST', f"/api/{step}", body))
+        raise ValueError(f"Unknown step: {step}")
+
+    def random_move(self):
+        """Pick a random empty cell of the last known board."""
+        if self.game_state is None:
+            return self.random.randrange(3), self.random.randrange(3)
+        cells = [(row, col) for row in range(3) for col in range(3)
+                 if self.game_state['board'][row][col] is None]
+        return self.random.choice(cells)
+
+    def update_state(self, response):
+        """Remember the game state from a response; stop the game on errors."""
+        if response is None or 'game_state' not in response:
+            return False
+        self.game_state = response['game_state']
+        return True
+
+    def request(self, method, path, body=None):
+        """
+        Send a paced request and record its latency.
+
+        Returns:
+            dict: Parsed JSON response, or None on errors
+        """
+        if self.interval:
+            delay = self.next_request_time - time.perf_counter()
+            if delay > 0:
+                self.stop_event.wait(delay)
+            self.next_request_time = max(self.next_request_time + self.interval, time.perf_counter())
+
+        route = path.split('?')[0]
+        headers = {'Content-Type': 'application/json'}
+        payload = json.dumps(body) if body is not None else None
+        start_time = time.perf_counter()
+        try:
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=120)
+            self.connection.request(method, path, body=payload, headers=headers)
+            response = self.connection.getresponse()
+            data = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            self.stats.record(route, (time.perf_counter() - start_time) * 1000, None)
+            if self.connection:
+                self.connection.close()
+            self.connection = None
+            return None
+
+        self.stats.record(route, (time.perf_counter() - start_time) * 1000, status)
+        if status >= 400:
+            return None
+        return json.loads(data)
+
+
+def read_rss_kb(pid):
+    """
+    Get the resident memory of a process and all of its descendants.
+
+    Returns:
+        int: Total RSS in KB, or None if it cannot be read
+    """
+    total = 0
+    pending = [pid]
+    found = False
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1])
+                        found = True
+                        break
+            with open(f"/proc/{current}/task/{current}/children") as f:
+                pending.extend(int(child) for child in f.read().split())
+        except (OSError, ValueError):
+            continue
+    return total if found else None
+
+
+def sample_rss(pid, stop_event, samples, interval=0.5):
+    """Sample the server's RSS until stop_event is set."""
+    while not stop_event.is_set():
+        rss = read_rss_kb(pid)
+        if rss is not None:
+            samples.append(rss)
+        stop_event.wait(interval)
+
+
+def wait_for_server(url, timeout=30):
+    """Wait until the server answers /api/game_state."""
+    parsed = urlparse(url)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=2)
+            connection.request('GET', '/api/game_state')
+            connection.getresponse().read()
+            connection.close()
+            return True
+        except (OSError, http.client.HTTPException):
+            time.sleep(0.2)
+    return False
+
+
+def run_load_test(scenario, url, server_pid=None, seed=0):
+    """
+    Run a scenario against a running server.
+
+    Returns:
+        dict: The load test report
+    """
+    stats = LoadStats()
+    stop_event = threading.Event()
+    rss_samples = []
+
+    sampler = None
+    if server_pid:
+        sampler = threading.Thread(target=sample_rss, args=(server_pid, stop_event, rss_samples),
+                                   daemon=True)
+        sampler.start()
+
+    clients = [
+        SimulatedClient(i, url, scenario, stats, stop_event, seed * 100003 + i)
+        for i in range(scenario.get('clients', 1))
+    ]
+    start_time = time.perf_counter()
+    for client in clients:
+        client.start()
+
+    stop_event.wait(scenario.get('duration_s', 10))
+    stop_event.set()
+    for client in clients:
+        client.join(timeout=120)
+    elapsed = time.perf_counter() - start_time
+    if sampler:
+        sampler.join()
+
+    report = stats.report(elapsed)
+    report['scenario'] = scenario.get('name')
+    report['clients'] = len(clients)
+    report['duration_s'] = elapsed
+    report['server_rss_kb'] = {
+        'start': rss_samples[0] if rss_samples else None,
+        'peak': max(rss_samples) if rss_samples else None,
+        'end': rss_samples[-1] if rss_samples else None
+    }
+    return report
+
+
+def print_report(report):
+    """Print a summary table of a report."""
+    print(f"Scenario {report['scenario']}: {report['clients']} clients, {report['duration_s']:.1f} s")
+    print(f"Throughput: {report['throughput_rps']:.1f} req/s, "
+          f"errors: {report['errors']} ({report['error_rate']:.1%})")
+    rss = report['server_rss_kb']
+    if rss['peak'] is not None:
+        print(f"Server RSS: start {rss['start'] / 1024:.1f} MB, peak {rss['peak'] / 1024:.1f} MB, "
+              f"end {rss['end'] / 1024:.1f} MB")
+    print(f"{'route':<22}{'requests':>10}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for route, result in report['routes'].items():
+        print(f"{route:<22}{result['requests']:>10}{result['errors']:>8}{result['p50_ms']:>10.1f}"
+              f"{result['p95_ms']:>10.1f}{result['p99_ms']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the TicTacMaster API.')
+    parser.add_argument('scenario', help='scenario JSON file')
+    parser.add_argument('--url', default='http://localhost:5001', help='server to test')
+    parser.add_argument('--server', choices=sorted(SERVER_COMMANDS),
+                        help='start a local server in this mode for the test')
+    parser.add_argument('--server-pid', type=int,
+                        help='pid of an already running server, to sample its RSS')
+    parser.add_argument('--seed', type=int, default=0, help='random seed for the clients')
+    parser.add_argument('--output', help='write the report to this JSON file')
+    args = parser.parse_args()
+
+    with open(args.scenario) as f:
+        scenario = json.load(f)
+
+    server = None
+    server_pid = args.server_pid
+    if args.server:
+        port = urlparse(args.url).port or 80
+        env = dict(os.environ, TICTAC_PORT=str(port))
+        # Own process group, so the Flask reloader and server workers stop with it
+        server = subprocess.Popen(SERVER_COMMANDS[args.server], cwd=BACKEND_DIR, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                  start_new_session=True)
+        server_pid = server.pid
+        if not wait_for_server(args.url):
+            os.killpg(server.pid, signal.SIGTERM)
+            print("Server did not start", file=sys.stderr)
+            return 1
+
+    try:
+        report = run_load_test(scenario, args.url, server_pid, args.seed)
+    finally:
+        if server:
+            os.killpg(server.pid, signal.SIGINT)
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                os.killpg(server.pid, signal.SIGKILL)
+
+    report['server_mode'] = args.server
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
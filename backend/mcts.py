@@ -0,0 +1,372 @@
+"""
+TicTacMaster - Monte Carlo Tree Search
+
+An alternative to the exhaustive minimax searches for boards and time
+budgets they cannot handle. MCTSAI grows a search tree with UCT selection
+and scores new leaves with random playouts. Positions are kept as a pair
+of bitboards, one bit per cell and player, so a playout is a shuffle of
+the empty cells followed by a few integer operations per move.
+
+MCTSAI has the same get_best_move / get_decision_tree interface as
+TicTacToeAI. The same instance keeps its tree between calls, so when it
+is asked for the next move of the same game the subtree under the moves
+played meanwhile is reused.
+"""
+import math
+import random
+import threading
+import time
+from game import SearchCancelled, TreeNode
+
+# Default budgets of a single search; the search stops at the first one reached
+DEFAULT_ITERATIONS = 5000
+DEFAULT_TIME_LIMIT_MS = 1000
+
+# UCT exploration constant
+DEFAULT_EXPLORATION = math.sqrt(2)
+
+# Index of each player's bitboard
+PLAYER_INDEX = {'X': 0, 'O': 1}
+PLAYERS = ('X', 'O')
+
+
+class MCTSNode:
+    """
+    A position in the MCTS tree.
+    """
+    __slots__ = ('move', 'parent', 'children', 'untried', 'bits', 'to_move',
+                 'winner', 'terminal', 'visits', 'value')
+
+    def __init__(self, bits, to_move, move=None, parent=None, winner=None, terminal=False):
+        self.move = move  # The cell index that led to this position
+        self.parent = parent
+        self.children = []
+        self.bits = bits  # (X bitboard, O bitboard)
+        self.to_move = to_move  # 0 for X, 1 for O
+        self.winner = winner  # Index of the winner, if the game is won
+        self.terminal = terminal
+        # Cells not expanded yet; set when the node is first selected
+        self.untried = None
+        self.visits = 0
+        # Playout results for the player who made move: 1 per win, 0.5 per draw
+        self.value = 0.0
+
+
+class MCTSAI:
+    """
+    AI player using Monte Carlo Tree Search with UCT.
+    """
+
+    def __init__(self, player='O', iterations=DEFAULT_ITERATIONS,
+                 time_limit_ms=DEFAULT_TIME_LIMIT_MS, exploration=DEFAULT_EXPLORATION, seed=None):
+        """
+        Initialize the AI player.
+
+        Args:
+            player: The AI's player symbol ('X' or 'O')
+            iterations: Maximum number of playouts per search, or None
+            time_limit_ms: Maximum search time in milliseconds, or None
+            exploration: UCT exploration constant
+            seed: Optional seed for the playouts
+        """
+        self.player = player
+        self.opponent = 'X' if player == 'O' else 'O'
+        self.iterations = iterations
+        self.time_limit_ms = time_limit_ms
+        self.exploration = exploration
+        self.random = random.Random(seed)
+        # Statistics of the last search
+        self.nodes_explored = 0
+        self.playouts = 0
+        self.playouts_per_second = 0.0
+        self.reused_visits = 0
+        self.max_depth_seen = 0
+        # Same hooks as TicTacToeAI
+        self.progress_callback = None
+        self.progress_interval = 1000
+        self.current_best_move = None
+        self.cancel_event = None
+        # Root of the tree kept between searches
+        self.root = None
+        self._size = None
+        # Held by every search and tree export. A caller sharing the engine
+        # between threads holds it across a whole search (hooks, search,
+        # export and statistics) so concurrent searches do not mix.
+        self.lock = threading.RLock()
+
+    def __getstate__(self):
+        # Locks cannot be sent to worker processes
+        state = self.__dict__.copy()
+        del state['lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.RLock()
+
+    def get_best_move(self, game, use_alpha_beta=True):
+        """
+        Get the best move for the AI based on the current game state.
+
+        Args:
+            game: TicTacToe instance
+            use_alpha_beta: Ignored, accepted for compatibility with TicTacToeAI
+
+        Returns:
+            tuple: (row, col) representing the best move
+        """
+        with self.lock:
+            return self._search(game)
+
+    def _search(self, game):
+        """Run the search. Call with the lock held."""
+        self.nodes_explored = 0
+        self.playouts = 0
+        self.playouts_per_second = 0.0
+        self.max_depth_seen = 0
+        self.current_best_move = None
+
+        if game.game_over or not game.get_available_moves():
+            self.root = None
+            return None
+
+        self._prepare_tables(game)
+        self.root = self._find_root(game)
+        self.reused_visits = self.root.visits
+        root = self.root
+
+        start_time = time.perf_counter()
+        deadline = None
+        if self.time_limit_ms is not None:
+            deadline = start_time + self.time_limit_ms / 1000
+
+        while self.iterations is None or self.playouts < self.iterations:
+            self._iterate(root)
+            self.playouts += 1
+            if self.playouts % self.progress_interval == 0:
+                self.current_best_move = self._to_row_col(self._most_visited(root).move)
+                self._check_interval()
+            # Reading the clock costs about as much as a playout step
+            if deadline is not None and self.playouts % 64 == 0 \
+                    and time.perf_counter() >= deadline:
+                break
+
+        elapsed = time.perf_counter() - start_time
+        if elapsed > 0:
+            self.playouts_per_second = self.playouts / elapsed
+
+        best_move = self._to_row_col(self._most_visited(root).move)
+        self.current_best_move = best_move
+        return best_move
+
+    def _check_interval(self):
+        """Periodic work during a search: report progress and honor cancellation."""
+        if self.progress_callback:
+            self.progress_callback(self.nodes_explored, self.current_best_move)
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise SearchCancelled("Search cancelled")
+
+    def _prepare_tables(self, game):
+        """Build the bitboard masks for the game's board size."""
+        if self._size == (game.size, game.win_length):
+            return
+        self._size = (game.size, game.win_length)
+        self._cells = game.size * game.size
+        line_masks = [sum(1 << (row * game.size + col) for row, col in line)
+                      for line in game.lines]
+        # Masks of the lines through each cell
+        self._cell_masks = [
+            [mask for mask in line_masks if mask >> cell & 1]
+            for cell in range(self._cells)
+        ]
+        self._full = (1 << self._cells) - 1
+        self.root = None
+
+    def _to_row_col(self, cell):
+        return divmod(cell, self._size[0])
+
+    def _game_bits(self, game):
+        """Get the bitboards of a game."""
+        bits = [0, 0]
+        for row, cells in enumerate(game.board):
+            for col, cell in enumerate(cells):
+                if cell is not None:
+                    bits[PLAYER_INDEX[cell]] |= 1 << (row * game.size + col)
+        return tuple(bits)
+
+    def _find_root(self, game):
+        """
+        Get the tree node for the game's position.
+
+        Reuses the subtree of the previous search when the position is at
+        most two moves below its root (the AI's move and the reply),
+        otherwise starts a new tree.
+        """
+        bits = self._game_bits(game)
+        to_move = PLAYER_INDEX[game.current_player]
+
+        if self.root is not None:
+            frontier = [self.root]
+            for _ in range(3):
+                for node in frontier:
+                    if node.bits == bits and node.to_move == to_move:
+                        node.parent = None
+                        node.move = None
+                        return node
+                frontier = [child for node in frontier for child in node.children]
+
+        return MCTSNode(bits, to_move)
+
+    def _iterate(self, root):
+        """Select, expand, play out and back-propagate once."""
+        node = root
+        depth = 0
+
+        # Selection
+        while not node.terminal:
+            if node.untried is None:
+                occupied = node.bits[0] | node.bits[1]
+                node.untried = [cell for cell in range(self._cells) if not occupied >> cell & 1]
+                self.random.shuffle(node.untried)
+            if node.untried:
+                break
+            node = self._select_child(node)
+            depth += 1
+            self.nodes_explored += 1
+
+        # Expansion
+        if not node.terminal:
+            node = self._expand(node, node.untried.pop())
+            depth += 1
+            self.nodes_explored += 1
+        self.max_depth_seen = max(self.max_depth_seen, depth)
+
+        # Simulation
+        winner = node.winner if node.terminal else self._playout(node)
+
+        # Back-propagation: each node is scored for the player who moved into it
+        while node is not None:
+            node.visits += 1
+            mover = 1 - node.to_move
+            if winner is None:
+                node.value += 0.5
+            elif winner == mover:
+                node.value += 1.0
+            node = node.parent
+
+    def _select_child(self, node):
+        """Pick the child with the highest UCT value."""
+        log_visits = math.log(node.visits)
+        exploration = self.exploration
+        best = None
+        best_value = float('-inf')
+        for child in node.children:
+            value = child.value / child.visits + \
+                exploration * math.sqrt(log_visits / child.visits)
+            if value > best_value:
+                best, best_value = child, value
+        return best
+
+    def _expand(self, node, cell):
+        """Add the child reached by playing cell."""
+        player = node.to_move
+        bits = list(node.bits)
+        bits[player] |= 1 << cell
+        won = any(bits[player] & mask == mask for mask in self._cell_masks[cell])
+        full = (bits[0] | bits[1]) == self._full
+        child = MCTSNode(tuple(bits), 1 - player, cell, node,
+                         winner=player if won else None, terminal=won or full)
+        node.children.append(child)
+        return child
+
+    def _playout(self, node):
+        """
+        Play random moves until the game ends.
+
+        Returns:
+            int: Index of the winning player, or None for a draw
+        """
+        bits = list(node.bits)
+        occupied = bits[0] | bits[1]
+        empty = [cell for cell in range(self._cells) if not occupied >> cell & 1]
+        self.random.shuffle(empty)
+        player = node.to_move
+        cell_masks = self._cell_masks
+        for cell in empty:
+            bits[player] |= 1 << cell
+            self.nodes_explored += 1
+            for mask in cell_masks[cell]:
+                if bits[player] & mask == mask:
+                    return player
+            player = 1 - player
+        return None
+
+    def _most_visited(self, node):
+        """Get the most visited child; ties go to the first expanded."""
+        return max(node.children, key=lambda child: child.visits)
+
+    def get_decision_tree(self, max_depth=None, tree_format='tree'):
+        """
+        Get the search tree for visualization, in the format of
+        TicTacToeAI.get_decision_tree.
+
+        Scores are the playout results from the AI's point of view, scaled
+        to the minimax range (-10 for always losing, +10 for always
+        winning), and every node carries its visit count. The best move
+        path follows the most visited children.
+
+        Args:
+            max_depth: Deepest level to include, or None for the whole tree
+            tree_format: 'tree' or 'dag'; summaries are not available for
+                         MCTS trees, which are bounded by the budget anyway
+
+        Returns:
+            dict: Tree data in a format suitable for frontend visualization
+        """
+        if self.root is None or not self.root.children:
+            return None
+
+        with self.lock:
+            root = self._export(self.root, None, max_depth)
+            node = root
+            while node.children:
+                node = max(node.children, key=lambda child: child.visits)
+                node.isBestMove = True
+
+        if tree_format == 'dag':
+            nodes, root_index = root.to_dag()
+            return {
+                'format': 'dag',
+                'root': root_index,
+                'nodes': nodes,
+                'maxDepth': self.max_depth_seen
+            }
+        return {
+            'root': root.to_dict(),
+            'maxDepth': self.max_depth_seen
+        }
+
+    def _export(self, node, parent, max_depth):
+        """Convert an MCTS node and its subtree to TreeNodes."""
+        size = self._size[0]
+        board = [[None] * size for _ in range(size)]
+        for cell in range(self._cells):
+            for index, player in enumerate(PLAYERS):
+                if node.bits[index] >> cell & 1:
+                    board[cell // size][cell % size] = player
+
+        move = self._to_row_col(node.move) if node.move is not None else None
+        tree_node = TreeNode(board, PLAYERS[node.to_move] == self.player, move, parent)
+        tree_node.visits = node.visits
+        if node.visits:
+            # node.value is from the point of view of the player who moved
+            win_rate = node.value / node.visits
+            if PLAYERS[1 - node.to_move] != self.player:
+                win_rate = 1 - win_rate
+            tree_node.score = round((2 * win_rate - 1) * 10, 2)
+
+        if max_depth is None or max_depth > 0:
+            child_depth = None if max_depth is None else max_depth - 1
+            for child in node.children:
+                tree_node.add_child(self._export(child, tree_node, child_depth))
+        return tree_node
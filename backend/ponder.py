@@ -0,0 +1,174 @@
+"""
+TicTacMaster - Pondering
+
+While the human is thinking, search the AI's reply to every legal human
+move in the background and keep the results in the game's search cache.
+When the human move arrives, the AI's reply is a cache lookup, or at worst
+a wait for a search that is already running.
+"""
+import threading
+from concurrent.futures import CancelledError
+from game import TicTacToe, SearchCancelled
+from search_pool import SearchPool, SearchPoolFull, run_search
+
+
+def search_key(board, player, use_alpha_beta, include_tree, tree_depth, tree_format='tree',
+               summary_top_k=None):
+    """
+    Build the search cache key for a position and search parameters.
+
+    Returns:
+        tuple: Hashable key
+    """
+    return (tuple(tuple(row) for row in board), player, bool(use_alpha_beta),
+            bool(include_tree), tree_depth, tree_format, summary_top_k)
+
+
+class PonderJob:
+    """
+    The background searches started for one position.
+    """
+
+    def __init__(self):
+        # search key -> (future, cancel event)
+        self.tasks = {}
+
+    def cancel(self, keep=None):
+        """Cancel every search except the one for the key keep."""
+        for key, (future, cancel_event) in self.tasks.items():
+            if key != keep:
+                cancel_event.set()
+                future.cancel()
+
+
+class Ponderer:
+    """
+    Runs pondering searches on a bounded background pool.
+    """
+
+    def __init__(self, max_concurrent=2, queue_depth=16):
+        """
+        Initialize the ponderer.
+
+        Args:
+            max_concurrent: Maximum number of pondering searches running at once
+            queue_depth: Maximum number of pondering searches waiting to run
+        """
+        # Cancellation needs shared events, so pondering always uses threads
+        self.pool = SearchPool(max_concurrent, queue_depth, 'thread')
+
+    def start(self, session, player, use_alpha_beta=True, include_tree=True, tree_depth=None,
+              tree_format='tree', summary_top_k=None):
+        """
+        Start pondering the human replies to the session's current position.
+
+        Call with the session lock held, right after the AI moved.
+
+        Args:
+            session: GameSession to ponder for
+            player: The AI's player symbol ('X' or 'O')
+            use_alpha_beta, include_tree, tree_depth, tree_format,
+                summary_top_k: Parameters of the searches to precompute, as
+                passed to run_search
+        """
+        self.cancel(session)
+        state = session.state
+        if state['game_over'] or state['current_player'] == player:
+            return
+
+        job = PonderJob()
+        session.ponder_job = job
+        base_game = TicTacToe.from_game_state(state)
+        for row, col in base_game.get_available_moves():
+            reply = TicTacToe.from_game_state(state)
+            reply.make_move(row, col)
+            if reply.game_over:
+                continue
+
+            reply_state = reply.get_game_state()
+            key = search_key(reply_state['board'], player, use_alpha_beta, include_tree,
+                             tree_depth, tree_format, summary_top_k)
+            cancel_event = threading.Event()
+            try:
+                future = self.pool.submit(run_search, reply_state, player, use_alpha_beta,
+                                          include_tree, None, tree_depth, cancel_event,
+                                          tree_format, summary_top_k)
+            except SearchPoolFull:
+                # The background pool is busy; the remaining replies will be
+                # searched on demand
+                break
+            future.add_done_callback(
+                lambda done, key=key: self._store(session, job, key, done))
+            job.tasks[key] = (future, cancel_event)
+
+    def _store(self, session, job, key, future):
+        """Store a finished pondering search in the session's cache."""
+        if future.cancelled() or future.exception() is not None:
+            return
+        # Results of a job that has been replaced or cancelled are stale
+        if session.ponder_job is job:
+            session.search_cache[key] = future.result()
+
+    def narrow(self, session, board):
+        """
+        Cancel the pondering searches that do not start from board.
+
+        Call when a move was made without asking for the AI's reply yet.
+        """
+        job = session.ponder_job
+        if job is None:
+            return
+        position = tuple(tuple(row) for row in board)
+        for key, (future, cancel_event) in job.tasks.items():
+            if key[0] != position:
+                cancel_event.set()
+                future.cancel()
+
+    def take(self, session, state, player, use_alpha_beta, include_tree, tree_depth,
+             tree_format='tree', summary_top_k=None, timeout=None):
+        """
+        Get the pondered search result for a position and stop pondering.
+
+        If the search for the position is still running, wait for it instead
+        of starting over, for at most timeout seconds; a search that is not
+        done by then is cancelled.
+
+        Returns:
+            dict: The run_search result, or None if the position was not pondered
+        """
+        key = search_key(state['board'], player, use_alpha_beta, include_tree, tree_depth,
+                         tree_format, summary_top_k)
+        result = session.search_cache.get(key)
+
+        job = session.ponder_job
+        session.ponder_job = None
+        if job is None:
+            return result
+
+        pending = None
+        if result is None and key in job.tasks:
+            pending = job.tasks[key][0]
+        job.cancel(keep=key if pending else None)
+
+        if pending is not None:
+            try:
+                result = pending.result(timeout=timeout)
+            except TimeoutError:
+                # Stop the search instead of leaving it running unused
+                job.cancel()
+                result = None
+            except (SearchCancelled, CancelledError):
+                result = None
+        return result
+
+    def cancel(self, session):
+        """Stop all pondering for a session and drop its cached results."""
+        job = session.ponder_job
+        session.ponder_job = None
+        if job is not None:
+            job.cancel()
+        session.search_cache = {}
+
+    def stats(self):
+        """Get the load of the background pool."""
+        return self.pool.stats()
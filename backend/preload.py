@@ -0,0 +1,176 @@
+"""
+TicTacMaster - Preloading
+
+State computed once when the server starts, so that the first requests of
+a new worker are as fast as later ones: the engine's static tables and an
+opening book holding the results of the expensive opening searches. When
+api.create_app() runs in a server's main process before its workers fork
+(e.g. gunicorn --preload), the workers share this state copy-on-write.
+
+The opening book can be saved to a snapshot file and loaded from it on the
+next start instead of being searched again.
+"""
+import json
+import os
+import time
+from game import TicTacToe, TREE_FORMATS, SUMMARY_TOP_K
+from ponder import search_key
+from search_pool import run_search
+
+# Board variants whose line tables are built at startup
+BOARD_SIZES = ((3, 3),)
+
+# Algorithms the opening book can hold
+BOOK_ALGORITHMS = ('minimax', 'alpha_beta')
+
+SNAPSHOT_VERSION = 1
+
+
+def preload_tables():
+    """Build the engine's static tables for every board in BOARD_SIZES."""
+    for size, win_length in BOARD_SIZES:
+        # TicTacToe builds (and caches) the line tables of its board size
+        TicTacToe(size, win_length)
+
+
+def book_key(board, player, use_alpha_beta, include_tree, tree_depth, tree_format='tree',
+             summary_top_k=None):
+    """
+    Build the opening book key of a search.
+
+    Like ponder.search_key, but tree options that do not change the result
+    are normalized, so equivalent requests share an entry.
+
+    Returns:
+        tuple: Hashable key
+    """
+    if not include_tree:
+        tree_depth, tree_format, summary_top_k = None, 'tree', None
+    elif tree_format == 'summary':
+        summary_top_k = summary_top_k or SUMMARY_TOP_K
+    else:
+        summary_top_k = None
+    return search_key(board, player, use_alpha_beta, include_tree, tree_depth,
+                      tree_format, summary_top_k)
+
+
+def _to_tuple(value):
+    """Convert nested JSON lists back to tuples."""
+    if isinstance(value, list):
+        return tuple(_to_tuple(item) for item in value)
+    return value
+
+
+class OpeningBook:
+    """
+    Search results of the opening positions, read-only once built.
+    """
+
+    def __init__(self):
+        # book key -> run_search() result
+        self.results = {}
+        # How the book was filled: None, 'searched' or 'snapshot'
+        self.source = None
+        self.build_ms = 0.0
+
+    def __len__(self):
+        return len(self.results)
+
+    def get(self, key):
+        """Get the stored result for a book key, or None."""
+        return self.results.get(key)
+
+    def build(self, algorithms=BOOK_ALGORITHMS):
+        """
+        Search the opening position with every search option clients use.
+
+        Only the empty board is searched: it is the one position where the
+        AI has to search the whole game tree. O's first move is decided
+        without a search, and positions two moves in are small.
+
+        Args:
+            algorithms: Algorithms to search with, from BOOK_ALGORITHMS
+        """
+        start_time = time.time()
+        game = TicTacToe()
+        state = game.get_game_state()
+        player = game.current_player
+
+        for algorithm in algorithms:
+            use_alpha_beta = algorithm == 'alpha_beta'
+            options = [(False, 'tree')]
+            for tree_format in TREE_FORMATS:
+                # The full minimax tree of the empty board is about 89 MB of
+                # JSON; clients fetching it are better served by 'dag'
+                if algorithm == 'minimax' and tree_format == 'tree':
+                    continue
+                options.append((True, tree_format))
+
+            for include_tree, tree_format in options:
+                result = run_search(state, player, use_alpha_beta, include_tree,
+                                    tree_format=tree_format)
+                key = book_key(state['board'], player, use_alpha_beta, include_tree, None,
+                               tree_format)
+                self.results[key] = result
+
+        self.source = 'searched'
+        self.build_ms = (time.time() - start_time) * 1000
+
+    def load(self, path):
+        """
+        Load the book from a snapshot file.
+
+        Returns:
+            bool: Whether the snapshot was loaded; False if it does not
+                  exist or was written by an incompatible version
+        """
+        start_time = time.time()
+        try:
+            with open(path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if snapshot.get('version') != SNAPSHOT_VERSION:
+            return False
+
+        self.results = {}
+        for key, result in snapshot['entries']:
+            result['move'] = _to_tuple(result['move'])
+            self.results[_to_tuple(key)] = result
+        self.source = 'snapshot'
+        self.build_ms = (time.time() - start_time) * 1000
+        return True
+
+    def save(self, path):
+        """Write the book to a snapshot file, replacing it atomically."""
+        snapshot = {
+            'version': SNAPSHOT_VERSION,
+            'entries': [[key, result] for key, result in self.results.items()]
+        }
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(temp_path, path)
+
+    def warm(self, algorithms=BOOK_ALGORITHMS, snapshot=None):
+        """
+        Fill the book from the snapshot file if there is one, otherwise by
+        searching, and then write the snapshot.
+
+        Args:
+            algorithms: Algorithms to search with when there is no snapshot
+            snapshot: Optional path of the snapshot file
+        """
+        if snapshot and self.load(snapshot):
+            return
+        self.build(algorithms)
+        if snapshot:
+            self.save(snapshot)
+
+    def stats(self):
+        """Get the size of the book and how it was filled."""
+        return {
+            'entries': len(self.results),
+            'source': self.source,
+            'build_ms': self.build_ms
+        }
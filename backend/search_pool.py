@@ -0,0 +1,272 @@
+"""
+TicTacMaster - Search Pool
+
+Runs AI searches on a bounded executor instead of on the thread that is
+serving the request. Admission control rejects new searches once all
+search slots and the waiting queue are taken, so a burst of expensive
+searches cannot starve the cheap endpoints.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import config
+from game import TicTacToe, TicTacToeAI, SUMMARY_TOP_K
+from shared_table import get_shared_table
+
+# Search algorithms selectable through the API
+ALGORITHMS = ('minimax', 'alpha_beta', 'mcts')
+
+
+class SearchPoolFull(Exception):
+    """Raised when a search is rejected because the pool is at capacity."""
+
+
+def run_search(state, player, use_alpha_beta=True, include_tree=True, progress=None,
+               tree_depth=None, cancel_event=None, tree_format='tree', summary_top_k=None,
+               engine=None):
+    """
+    Search a game state for the best move.
+
+    This is the unit of work submitted to the pool. It only takes and
+    returns plain data so it can run in a worker process as well as a thread.
+    Minimax trees are recorded within config.TREE_NODE_BUDGET nodes.
+
+    Args:
+        state: Game state dictionary as returned by TicTacToe.get_game_state()
+        player: The AI's player symbol ('X' or 'O')
+        use_alpha_beta: Whether to use Alpha-Beta pruning
+        include_tree: Whether to serialize the decision tree
+        progress: Optional callable(nodes_explored, best_move) for live
+                  progress. Only usable with thread executors.
+        tree_depth: Deepest tree level to serialize, or None for the whole tree
+        cancel_event: Optional threading.Event that stops the search with
+                      SearchCancelled. Only usable with thread executors.
+        tree_format: Serialization of the decision tree, one of TREE_FORMATS.
+                     'summary' summarizes the tree during the search.
+        summary_top_k: Lines kept at every node of a summary tree, or None
+                       for SUMMARY_TOP_K
+        engine: Optional AI to search with instead of a new TicTacToeAI,
+                such as an mcts.MCTSAI that keeps its tree between moves.
+                Its lock is held for the whole search.
+
+    Returns:
+        dict: The best move, search statistics and the decision tree, plus
+              the playout counts for MCTS engines
+    """
+    start_time = time.time()
+
+    game = TicTacToe.from_game_state(state)
+    ai = engine or TicTacToeAI(player)
+    # A shared engine may be searched by another request at the same time;
+    # hold it until its tree and statistics have been read
+    with ai.lock if engine is not None else nullcontext():
+        ai.progress_callback = progress
+        ai.cancel_event = cancel_event
+        if include_tree and tree_format == 'summary' and engine is None:
+            ai.summary_top_k = summary_top_k or SUMMARY_TOP_K
+        elif engine is None:
+            ai.tree_budget = config.TREE_NODE_BUDGET
+            ai.tree_capture = config.TREE_CAPTURE
+            ai.tree_cutoff_depth = config.TREE_CUTOFF_DEPTH
+        try:
+            best_move = ai.get_best_move(game, use_alpha_beta)
+            decision_tree = (ai.get_decision_tree(tree_depth, tree_format)
+                             if include_tree else None)
+        finally:
+            # Hooks left on a shared engine would outlive this request
+            ai.progress_callback = None
+            ai.cancel_event = None
+
+        result = {
+            'move': best_move,
+            'nodes_explored': ai.nodes_explored,
+            'decision_time_ms': (time.time() - start_time) * 1000,  # Convert to milliseconds
+            'decision_tree': decision_tree
+        }
+        if hasattr(ai, 'playouts'):
+            result['playouts'] = ai.playouts
+            result['playouts_per_second'] = ai.playouts_per_second
+    return result
+
+
+def run_analysis(state, player, top_k=None, cancel_event=None):
+    """
+    Score the best moves of a game state (multi-PV analysis).
+
+    Args:
+        state: Game state dictionary as returned by TicTacToe.get_game_state()
+        player: Player whose moves are scored ('X' or 'O')
+        top_k: Number of moves to score, or None for all legal moves
+        cancel_event: Optional threading.Event that stops the search with
+                      SearchCancelled. Only usable with thread executors.
+
+    Returns:
+        dict: The scored moves and search statistics
+    """
+    start_time = time.time()
+
+    game = TicTacToe.from_game_state(state)
+    ai = TicTacToeAI(player)
+    ai.shared_table = get_shared_table()
+    ai.cancel_event = cancel_event
+    lines = ai.analyze(game, top_k)
+
+    return {
+        'lines': lines,
+        'nodes_explored': ai.nodes_explored,
+        'decision_time_ms': (time.time() - start_time) * 1000  # Convert to milliseconds
+    }
+
+
+class SearchPool:
+    """
+    Bounded executor for AI searches with admission control.
+    """
+
+    def __init__(self, max_concurrent=2, queue_depth=4, executor='thread'):
+        """
+        Initialize the pool.
+
+        Args:
+            max_concurrent: Maximum number of searches running at once
+            queue_depth: Maximum number of admitted searches waiting to run
+            executor: 'thread' or 'process'
+        """
+        self.max_concurrent = max_concurrent
+        self.queue_depth = queue_depth
+        self.executor_type = executor
+        # Callbacks cannot be passed to worker processes
+        self.supports_progress = executor == 'thread'
+        self._lock = threading.Lock()
+        # Searches that were admitted and have not finished (running + queued)
+        self._pending = 0
+        self._rejected = 0
+
+        if executor not in ('thread', 'process'):
+            raise ValueError(f"Unknown search executor: {executor}")
+        # Created on first use, see _get_executor
+        self._executor = None
+        self._executor_pid = None
+
+    def _get_executor(self):
+        """
+        Get this process's executor, creating it on first use.
+
+        The pool is built at import, before a preloading server forks its
+        workers. Executors must not be shared across fork(): worker
+        processes, queues and threads would belong to the parent, so every
+        process builds its own.
+        """
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                if self.executor_type == 'process':
+                    # Forking a multi-threaded server process can deadlock
+                    # its children; start the workers from a clean process
+                    methods = multiprocessing.get_all_start_methods()
+                    context = multiprocessing.get_context(
+                        'forkserver' if 'forkserver' in methods else 'spawn')
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_concurrent,
+                                                         mp_context=context)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent,
+                                                        thread_name_prefix='search')
+                self._executor_pid = os.getpid()
+                # Searches admitted by the parent do not run here
+                self._pending = 0
+            return self._executor
+
+    def submit(self, fn, *args):
+        """
+        Submit a search to the pool.
+
+        Args:
+            fn: Callable to run, must be picklable for process executors
+            *args: Arguments for fn
+
+        Returns:
+            concurrent.futures.Future: Future for the search result
+
+        Raises:
+            SearchPoolFull: If every search slot and queue position is taken
+        """
+        executor = self._get_executor()
+        with self._lock:
+            if self._pending >= self.max_concurrent + self.queue_depth:
+                self._rejected += 1
+                raise SearchPoolFull("Too many searches in progress")
+            self._pending += 1
+
+        try:
+            future = executor.submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def run(self, fn, *args, timeout=None, cancel_event=None):
+        """
+        Submit a search and wait for its result.
+
+        A search that is not done in time is cancelled, so that it does not
+        keep its slot in the pool after its caller gave up.
+
+        Args:
+            fn: Callable to run
+            *args: Arguments for fn
+            timeout: Seconds to wait before giving up, or None to wait forever
+            cancel_event: The cancel event passed to fn in args, if any (see
+                          cancel_event()). It is set when the wait times out.
+
+        Returns:
+            The return value of fn
+        """
+        future = self.submit(fn, *args)
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            # Only stops a search that has not started yet
+            future.cancel()
+            if cancel_event is not None:
+                cancel_event.set()
+            raise
+
+    def cancel_event(self):
+        """
+        Get an event to stop a search on this pool with, or None if the
+        pool cannot share events with its searches (process executors).
+        """
+        return threading.Event() if self.executor_type == 'thread' else None
+
+    def _release(self):
+        """Free the admission slot of a finished search."""
+        with self._lock:
+            self._pending -= 1
+
+    def stats(self):
+        """
+        Get the current load of the pool.
+
+        Returns:
+            dict: Running, queued and rejected search counts and limits
+        """
+        with self._lock:
+            pending = self._pending
+            rejected = self._rejected
+        return {
+            'executor': self.executor_type,
+            'running': min(pending, self.max_concurrent),
+            'queued': max(0, pending - self.max_concurrent),
+            'rejected': rejected,
+            'max_concurrent': self.max_concurrent,
+            'queue_depth': self.queue_depth
+        }
+
+    def shutdown(self, wait=True):
+        """Stop the executor."""
+        if self._executor is not None and self._executor_pid == os.getpid():
+            self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,309 @@
+"""
+TicTacMaster - Shared Transposition Table
+
+A fixed-size hash table of solved positions that every process on the host
+can read and write. A position solved by one server worker is then known to
+all of them, instead of being solved again by each worker in its own
+memory. The table lives in a named multiprocessing.shared_memory block or
+in a memory-mapped file; a file-backed table also survives server restarts.
+
+The table is lock-free. Every entry is two 64-bit words, a verification word
+(the position hash XOR the data word) and the data word. A reader checks
+that the two words it read give back the hash of its position, so an entry
+torn by two processes writing it at the same time reads as a miss instead
+of a wrong score.
+
+Entries are grouped in buckets of four, one 64-byte cache line per bucket.
+A store updates the position's own entry if the bucket has one, otherwise
+fills a free slot, and only evicts an entry when the whole bucket is taken,
+choosing the one that took the fewest nodes to compute. An exact score is
+never replaced by a bound for the same position. With the default size
+every 3x3 position fits, so nothing is ever evicted.
+"""
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+import config
+
+try:
+    import fcntl
+except ImportError:  # Windows: files are opened without locking
+    fcntl = None
+
+# Default number of entries, 16 bytes each
+DEFAULT_ENTRIES = 65536
+
+# Name of the shared memory block used with TICTAC_SHARED_TABLE=shm
+DEFAULT_SHM_NAME = 'tictacmaster_tt'
+
+BUCKET_SIZE = 4
+MAGIC = b'TICTACTT'
+VERSION = 1
+
+# Header: magic, version, bucket size, number of buckets; padded to 64 bytes
+HEADER = struct.Struct('<8sIIQ')
+HEADER_BYTES = 64
+ENTRY = struct.Struct('<QQ')
+
+# Layout of the data word
+VALID_BIT = 1 << 63
+SCORE_BIAS = 1 << 15
+MAX_WORK = (1 << 32) - 1
+EXACT = 0
+
+# Seconds a process attaching to a new shared memory block waits for its
+# creator to write the header
+ATTACH_TIMEOUT = 1.0
+
+
+def position_hash(game):
+    """
+    Get the 64-bit hash identifying a position in the table.
+
+    Args:
+        game: TicTacToe instance
+
+    Returns:
+        int: Hash of the board, its size and win length and the player to move
+    """
+    cells = bytes(0 if cell is None else 1 if cell == 'X' else 2
+                  for row in game.board for cell in row)
+    data = bytes((game.size, game.win_length, game.current_player == 'X')) + cells
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+def _pack(score, bound, move, work):
+    """Pack an entry into its data word."""
+    return (VALID_BIT
+            | (score + SCORE_BIAS)
+            | bound << 16
+            | (0 if move is None else move + 1) << 18
+            | min(work, MAX_WORK) << 28)
+
+
+def _unpack(data):
+    """
+    Unpack a data word.
+
+    Returns:
+        tuple: (score, bound, move, work)
+    """
+    move = data >> 18 & 0x3ff
+    return ((data & 0xffff) - SCORE_BIAS,
+            data >> 16 & 0x3,
+            move - 1 if move else None,
+            data >> 28 & MAX_WORK)
+
+
+class SharedTranspositionTable:
+    """
+    Transposition table shared between processes.
+
+    Scores are stored from X's point of view; callers searching for O
+    negate them.
+    """
+
+    def __init__(self, path=None, name=None, entries=DEFAULT_ENTRIES):
+        """
+        Open the table, creating it if needed.
+
+        Args:
+            path: File backing the table
+            name: Name of the shared memory block backing the table, used
+                  when no path is given
+            entries: Number of entries of a new table. An existing shared
+                     memory block keeps its size; an existing file of a
+                     different size is cleared and resized.
+        """
+        self.buckets = max(1, entries // BUCKET_SIZE)
+        self.size = HEADER_BYTES + self.buckets * BUCKET_SIZE * ENTRY.size
+        self._shm = None
+        self._mmap = None
+        # Lookups and stores made by this process
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+        if path is not None:
+            self.backing = 'file'
+            self.location = path
+            self._open_file(path)
+        else:
+            self.backing = 'shm'
+            self.location = name or DEFAULT_SHM_NAME
+            self._open_shm(self.location)
+
+    def _open_file(self, path):
+        """Map the table file, formatting it when it is new or incompatible."""
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            reformat = os.fstat(fd).st_size != self.size
+            if reformat:
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, self.size)
+            self._mmap = mmap.mmap(fd, self.size)
+            self.buf = memoryview(self._mmap)
+            if reformat or not self._header_valid():
+                self._format()
+        finally:
+            # The mapping stays valid after the descriptor is closed
+            os.close(fd)
+
+    def _open_shm(self, name):
+        """Create the shared memory block, or attach to an existing one."""
+        try:
+            self._shm = shared_memory.SharedMemory(name, create=True, size=self.size)
+            created = True
+        except FileExistsError:
+            self._shm = shared_memory.SharedMemory(name)
+            created = False
+        # The block belongs to the host, not to this process: keep the
+        # resource tracker from unlinking it when this process exits
+        resource_tracker.unregister(self._shm._name, 'shared_memory')
+        self.buf = self._shm.buf
+
+        if created:
+            self._format()
+            return
+        deadline = time.monotonic() + ATTACH_TIMEOUT
+        while not self._header_valid():
+            if time.monotonic() >= deadline:
+                raise ValueError(f"Shared memory block {name} is not a transposition table")
+            time.sleep(0.01)
+        _, _, _, self.buckets = HEADER.unpack_from(self.buf, 0)
+        self.size = HEADER_BYTES + self.buckets * BUCKET_SIZE * ENTRY.size
+
+    def _header_valid(self):
+        magic, version, bucket_size, buckets = HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC or version != VERSION or bucket_size != BUCKET_SIZE:
+            return False
+        return HEADER_BYTES + buckets * BUCKET_SIZE * ENTRY.size <= len(self.buf)
+
+    def _format(self):
+        """Clear every entry, then write the header."""
+        self.buf[HEADER_BYTES:self.size] = bytes(self.size - HEADER_BYTES)
+        # The magic goes in last, so that attaching processes only see a
+        # finished table
+        HEADER.pack_into(self.buf, 0, MAGIC, VERSION, BUCKET_SIZE, self.buckets)
+
+    def _bucket_offset(self, key):
+        return HEADER_BYTES + key % self.buckets * BUCKET_SIZE * ENTRY.size
+
+    def lookup(self, game):
+        """
+        Look up a position.
+
+        Args:
+            game: TicTacToe instance
+
+        Returns:
+            tuple: (score for X, bound type, best move as a cell index or
+                   None), or None if the position is not in the table
+        """
+        key = position_hash(game)
+        offset = self._bucket_offset(key)
+        self.probes += 1
+        for slot in range(BUCKET_SIZE):
+            check, data = ENTRY.unpack_from(self.buf, offset + slot * ENTRY.size)
+            if data & VALID_BIT and check ^ data == key:
+                self.hits += 1
+                return _unpack(data)[:3]
+        return None
+
+    def store(self, game, score, bound, move, work):
+        """
+        Store the result of a search.
+
+        Args:
+            game: TicTacToe instance searched
+            score: Score for X
+            bound: EXACT, LOWER_BOUND or UPPER_BOUND
+            move: Best move as a cell index, or None
+            work: Nodes searched to get the score; entries that took less
+                  work are evicted first
+        """
+        key = position_hash(game)
+        offset = self._bucket_offset(key)
+        data = _pack(score, bound, move, work)
+
+        target = None
+        target_work = None
+        for slot in range(BUCKET_SIZE):
+            slot_offset = offset + slot * ENTRY.size
+            check, old = ENTRY.unpack_from(self.buf, slot_offset)
+            if old & VALID_BIT and check ^ old == key:
+                # The position's own entry: keep an exact score over a bound
+                if bound != EXACT and _unpack(old)[1] == EXACT:
+                    return
+                target = slot_offset
+                break
+            # Free and torn slots are taken before any valid entry
+            old_work = _unpack(old)[3] if old & VALID_BIT else -1
+            if target is None or old_work < target_work:
+                target, target_work = slot_offset, old_work
+
+        ENTRY.pack_into(self.buf, target, key ^ data, data)
+        self.stores += 1
+
+    def stats(self):
+        """Get the table's size and the lookups made by this process."""
+        return {
+            'backing': self.backing,
+            'location': self.location,
+            'entries': self.buckets * BUCKET_SIZE,
+            'bytes': self.size,
+            'probes': self.probes,
+            'hits': self.hits,
+            'stores': self.stores
+        }
+
+    def close(self):
+        """Unmap the table from this process. The stored entries are kept."""
+        self.buf.release()
+        if self._shm is not None:
+            self._shm.close()
+        if self._mmap is not None:
+            self._mmap.close()
+
+    def unlink(self):
+        """Delete the table's shared memory block or file."""
+        if self._shm is not None:
+            # unlink() unregisters the block from the resource tracker
+            resource_tracker.register(self._shm._name, 'shared_memory')
+            self._shm.unlink()
+        else:
+            os.unlink(self.location)
+
+
+_shared_table = None
+_shared_table_pid = None
+_shared_table_lock = threading.Lock()
+
+
+def get_shared_table():
+    """
+    Get this process's handle on the table configured by
+    TICTAC_SHARED_TABLE.
+
+    Returns:
+        SharedTranspositionTable: The table, or None when it is disabled
+    """
+    global _shared_table, _shared_table_pid
+    if not config.SHARED_TABLE:
+        return None
+    with _shared_table_lock:
+        # Forked children inherit the mapping but not the parent's counters
+        if _shared_table is None or _shared_table_pid != os.getpid():
+            if config.SHARED_TABLE == 'shm':
+                _shared_table = SharedTranspositionTable(entries=config.SHARED_TABLE_ENTRIES)
+            else:
+                _shared_table = SharedTranspositionTable(path=config.SHARED_TABLE,
+                                                         entries=config.SHARED_TABLE_ENTRIES)
+            _shared_table_pid = os.getpid()
+        return _shared_table
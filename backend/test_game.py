@@ -0,0 +1,127 @@
+"""
+TicTacMaster - Game Logic Tests
+
+Checks the incrementally maintained line counters, win detection and static
+evaluation of TicTacToe against a full rescan of the board.
+
+Run from the backend directory with: python -m unittest test_game
+"""
+import random
+import unittest
+from game import TicTacToe, _line_weight
+
+
+def rescan_lines(game):
+    """Get every line of win_length cells on the board, found from scratch."""
+    lines = []
+    for row in range(game.size):
+        for col in range(game.size):
+            for d_row, d_col in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                cells = [(row + d_row * i, col + d_col * i) for i in range(game.win_length)]
+                if all(0 <= r < game.size and 0 <= c < game.size for r, c in cells):
+                    lines.append(cells)
+    return lines
+
+
+def rescan_winner(game):
+    """Get the player holding a full line, by checking every line."""
+    for cells in rescan_lines(game):
+        marks = {game.board[row][col] for row, col in cells}
+        if len(marks) == 1 and None not in marks:
+            return marks.pop()
+    return None
+
+
+def rescan_score(game):
+    """Get the static evaluation for X, by counting the marks of every line."""
+    score = 0
+    for cells in rescan_lines(game):
+        marks = [game.board[row][col] for row, col in cells]
+        x_marks, o_marks = marks.count('X'), marks.count('O')
+        if o_marks == 0:
+            score += _line_weight(x_marks, game.win_length)
+        if x_marks == 0:
+            score -= _line_weight(o_marks, game.win_length)
+    return score
+
+
+class TicTacToeTest(unittest.TestCase):
+
+    def assert_consistent(self, game):
+        """Check the incremental state of a game against a rescan."""
+        self.assertEqual(game.winner, rescan_winner(game))
+        self.assertEqual(game.evaluate('X'), rescan_score(game))
+        self.assertEqual(game.evaluate('O'), -rescan_score(game))
+        for player in ('X', 'O'):
+            self.assertEqual(game.line_counts[player],
+                             [sum(game.board[row][col] == player for row, col in line)
+                              for line in game.lines])
+        full = all(cell is not None for row in game.board for cell in row)
+        self.assertEqual(game.game_over, game.winner is not None or full)
+
+    def check_move_and_undo(self, game, row, col):
+        """Make a move and take it back, checking both states."""
+        counts = {player: game.line_counts[player][:] for player in ('X', 'O')}
+        line_score = game._line_score
+        state = game.get_game_state()
+
+        self.assertTrue(game.make_move(row, col))
+        self.assert_consistent(game)
+        self.assertTrue(game.undo_move(row, col))
+
+        self.assertEqual(game.line_counts, counts)
+        self.assertEqual(game._line_score, line_score)
+        self.assertEqual(game.get_game_state(), state)
+
+    def test_every_reachable_3x3_position(self):
+        game = TicTacToe()
+        seen = set()
+
+        def visit():
+            key = game.position_key()
+            if key in seen:
+                return
+            seen.add(key)
+            self.assert_consistent(game)
+            for move in game.get_available_moves() if not game.game_over else []:
+                self.check_move_and_undo(game, *move)
+                game.make_move(*move)
+                visit()
+                game.undo_move(*move)
+
+        visit()
+        self.assertEqual(len(seen), 5478)
+
+    def test_larger_boards(self):
+        generator = random.Random(7)
+        for size, win_length in ((4, 4), (5, 4), (6, 5)):
+            for _ in range(100):
+                game = TicTacToe(size, win_length)
+                while not game.game_over:
+                    move = generator.choice(game.get_available_moves())
+                    self.check_move_and_undo(game, *move)
+                    game.make_move(*move)
+                self.assert_consistent(game)
+
+    def test_win_on_last_move_lines(self):
+        game = TicTacToe(4, 3)
+        for move in ((0, 0), (3, 3), (1, 1), (3, 2)):
+            game.make_move(*move)
+        self.assertFalse(game.game_over)
+        game.make_move(2, 2)
+        self.assertEqual(game.winner, 'X')
+        self.assertTrue(game.game_over)
+        self.assertFalse(game.make_move(0, 3))
+
+    def test_copy_and_game_state_keep_counters(self):
+        game = TicTacToe(4, 4)
+        for move in ((1, 1), (0, 0), (2, 2), (0, 3), (1, 2)):
+            game.make_move(*move)
+        for other in (game.copy(), TicTacToe.from_game_state(game.get_game_state())):
+            self.assertEqual(other.line_counts, game.line_counts)
+            self.assertEqual(other.evaluate('X'), game.evaluate('X'))
+            self.check_move_and_undo(other, 3, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
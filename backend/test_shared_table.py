@@ -0,0 +1,112 @@
+"""
+TicTacMaster - Shared Transposition Table Tests
+
+Run from the backend directory with: python -m unittest test_shared_table
+"""
+import os
+import tempfile
+import unittest
+from game import TicTacToe, TicTacToeAI, EXACT, LOWER_BOUND, UPPER_BOUND
+from shared_table import (ENTRY, MAX_WORK, SharedTranspositionTable, _pack, _unpack,
+                          position_hash)
+
+
+class PackTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        for entry in [(0, EXACT, None, 0), (10, LOWER_BOUND, 0, 1), (-10, UPPER_BOUND, 8, 12345),
+                      (-32768, EXACT, 1022, MAX_WORK), (32767, UPPER_BOUND, 4, 7)]:
+            self.assertEqual(_unpack(_pack(*entry)), entry)
+
+    def test_work_is_capped(self):
+        self.assertEqual(_unpack(_pack(3, EXACT, 4, MAX_WORK + 100)), (3, EXACT, 4, MAX_WORK))
+
+
+class SharedTableTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.table = SharedTranspositionTable(path=os.path.join(self.directory.name, 'tt'),
+                                              entries=4096)
+
+    def tearDown(self):
+        self.table.close()
+        self.directory.cleanup()
+
+    def _slot_of(self, game):
+        """Get the offset of the slot holding a position."""
+        key = position_hash(game)
+        offset = self.table._bucket_offset(key)
+        for slot in range(4):
+            check, data = ENTRY.unpack_from(self.table.buf, offset + slot * ENTRY.size)
+            if data and check ^ data == key:
+                return offset + slot * ENTRY.size
+        return None
+
+    def test_store_and_lookup(self):
+        game = TicTacToe()
+        game.make_move(1, 1)
+        self.assertIsNone(self.table.lookup(game))
+        self.table.store(game, -3, LOWER_BOUND, 4, 100)
+        self.assertEqual(self.table.lookup(game), (-3, LOWER_BOUND, 4))
+
+    def test_torn_entry_is_a_miss(self):
+        game = TicTacToe()
+        game.make_move(0, 0)
+        self.table.store(game, 5, EXACT, 8, 10)
+        offset = self._slot_of(game)
+        check, data = ENTRY.unpack_from(self.table.buf, offset)
+
+        # The data word of another write landed without its check word
+        other = _pack(-5, UPPER_BOUND, 2, 10)
+        ENTRY.pack_into(self.table.buf, offset, check, other)
+        self.assertIsNone(self.table.lookup(game))
+
+        # A store takes the torn slot over
+        self.table.store(game, 7, EXACT, 2, 10)
+        self.assertEqual(self.table.lookup(game), (7, EXACT, 2))
+
+    def test_exact_score_is_kept_over_a_bound(self):
+        game = TicTacToe()
+        self.table.store(game, 0, EXACT, 4, 10)
+        self.table.store(game, 10, LOWER_BOUND, 0, 1000)
+        self.assertEqual(self.table.lookup(game), (0, EXACT, 4))
+
+    def test_scores_are_stored_for_x(self):
+        game = TicTacToe()
+        game.make_move(0, 0)
+        ai_x = TicTacToeAI('X')
+        ai_o = TicTacToeAI('O')
+        ai_x.shared_table = ai_o.shared_table = self.table
+
+        # O's lower bound is an upper bound for X
+        ai_o._shared_store(game, 4, LOWER_BOUND, (1, 1), 10)
+        self.assertEqual(self.table.lookup(game), (-4, UPPER_BOUND, 4))
+        self.assertEqual(ai_o._shared_lookup(game), (4, LOWER_BOUND, (1, 1)))
+        self.assertEqual(ai_x._shared_lookup(game), (-4, UPPER_BOUND, (1, 1)))
+
+    def test_principal_variation_follows_shared_table(self):
+        game = TicTacToe()
+        game.make_move(1, 1)
+        game.make_move(0, 0)
+
+        first = TicTacToeAI('X')
+        first.shared_table = self.table
+        lines = first.analyze(game)
+
+        # The second analysis is answered from the shared table, and its
+        # principal variations still run to the end of the game
+        second = TicTacToeAI('X')
+        second.shared_table = self.table
+        second_lines = second.analyze(game)
+        self.assertEqual([(line['move'], line['score']) for line in second_lines],
+                         [(line['move'], line['score']) for line in lines])
+        for line in second_lines:
+            end = TicTacToe.from_game_state(game.get_game_state())
+            for move in line['pv']:
+                self.assertTrue(end.make_move(*move))
+            self.assertTrue(end.game_over)
+
+
+if __name__ == '__main__':
+    unittest.main()
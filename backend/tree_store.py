@@ -0,0 +1,65 @@
+"""
+TicTacMaster - Decision Tree Spill Store
+
+Temporary on-disk storage for finished decision subtrees. A search whose
+tree outgrows its node budget writes finished subtrees here and drops them
+from memory; they are read back only when the tree is serialized, and only
+if they fall within the requested depth.
+"""
+import json
+import tempfile
+
+
+class SpillStore:
+    """
+    Append-only temporary file of serialized subtrees.
+
+    The file is deleted when the store is closed or garbage collected.
+    """
+
+    def __init__(self, directory=None):
+        """
+        Create the store.
+
+        Args:
+            directory: Directory for the temporary file, or None for the
+                       system default
+        """
+        self.file = tempfile.TemporaryFile(dir=directory)
+        self.bytes_written = 0
+        self.subtrees = 0
+
+    def write(self, children):
+        """
+        Store the serialized children of a node.
+
+        Args:
+            children: List of TreeNode.to_dict() results
+
+        Returns:
+            tuple: (offset, length) reference for read()
+        """
+        data = json.dumps(children, separators=(',', ':')).encode()
+        offset = self.bytes_written
+        self.file.seek(offset)
+        self.file.write(data)
+        self.bytes_written += len(data)
+        self.subtrees += 1
+        return offset, len(data)
+
+    def read(self, ref):
+        """
+        Read back the children stored by write().
+
+        Args:
+            ref: (offset, length) returned by write()
+
+        Returns:
+            list: The serialized children
+        """
+        offset, length = ref
+        self.file.seek(offset)
+        return json.loads(self.file.read(length))
+
+    def close(self):
+        self.file.close()
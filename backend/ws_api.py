@@ -0,0 +1,312 @@
+"""
+TicTacMaster - WebSocket API
+
+Persistent channel for AI turns, served by the ASGI entry point at
+/api/ws/ai_game?game_id=<id>. Instead of an HTTP round trip per move, the
+client sends commands and the server pushes moves, stats and live search
+progress.
+
+Client messages:
+    {"type": "move", "use_alpha_beta": true, "include_tree": true, "tree_format": "tree",
+     "summary_top_k": 3}
+        Let the AI make one move for the player to move.
+    {"type": "play", "use_alpha_beta": true, "include_tree": false, "delay_ms": 500}
+        Let the AI play both sides until the game is over.
+    Both also accept "algorithm" ("minimax", "alpha_beta" or "mcts") in
+    place of use_alpha_beta.
+    {"type": "stop"}
+        Stop a running "play" command after the current move.
+
+Server messages:
+    {"type": "progress", "player", "nodes_explored", "best_move"}
+    {"type": "move", "player", "move", "game_state", "stats", "decision_tree"}
+    {"type": "game_over", "game_state"}
+    {"type": "error", "message"}
+
+Progress is coalesced: while a search runs only the latest progress report
+is kept, and at most one is sent every progress_interval_ms. Progress is
+only available when searches run on the thread executor.
+"""
+import asyncio
+import json
+import logging
+import threading
+from urllib.parse import parse_qs
+from api import (games, search_pool, play_searched_move, mcts_engine, search_stats, opening_book,
+                 is_top_k)
+from game import TREE_FORMATS
+from preload import book_key
+from search_pool import ALGORITHMS, SearchPoolFull, run_search
+
+# Minimum time between two progress messages for the same search
+PROGRESS_INTERVAL_MS = 100
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressRelay:
+    """
+    Hands the latest progress report from a search thread to the event loop.
+    """
+
+    def __init__(self, loop):
+        self._loop = loop
+        self._lock = threading.Lock()
+        self._latest = None
+        self._ready = asyncio.Event()
+
+    def publish(self, nodes_explored, best_move):
+        """Record a progress report. Called from the search thread."""
+        with self._lock:
+            wake = self._latest is None
+            self._latest = (nodes_explored, best_move)
+        if wake:
+            self._loop.call_soon_threadsafe(self._ready.set)
+
+    async def next(self):
+        """Wait for a progress report, returning only the most recent one."""
+        await self._ready.wait()
+        self._ready.clear()
+        with self._lock:
+            latest = self._latest
+            self._latest = None
+        return latest
+
+
+class AiGameConnection:
+    """
+    State of one WebSocket connection.
+    """
+
+    def __init__(self, session, send):
+        self.session = session
+        self._send = send
+        self._send_lock = asyncio.Lock()
+        self.task = None
+        self.stop_requested = False
+
+    async def send_json(self, message):
+        """Send a JSON message to the client."""
+        async with self._send_lock:
+            await self._send({'type': 'websocket.send', 'text': json.dumps(message)})
+
+    async def play(self, use_alpha_beta=True, include_tree=True, until_game_over=False,
+                   delay_ms=0, progress_interval_ms=PROGRESS_INTERVAL_MS, tree_format='tree',
+                   summary_top_k=None, algorithm=None):
+        """
+        Let the AI make one move, or keep moving until the game is over.
+        """
+        self.stop_requested = False
+
+        while True:
+            state = self.session.state
+
+            if state['game_over']:
+                await self.send_json({'type': 'game_over', 'game_state': state})
+                return
+
+            game_state = await self._ai_move(state, use_alpha_beta, include_tree,
+                                             progress_interval_ms, tree_format, summary_top_k,
+                                             algorithm)
+            if game_state is None or not until_game_over or self.stop_requested:
+                return
+            if game_state['game_over']:
+                await self.send_json({'type': 'game_over', 'game_state': game_state})
+                return
+
+            if delay_ms:
+                await asyncio.sleep(delay_ms / 1000)
+
+    async def _ai_move(self, state, use_alpha_beta, include_tree, progress_interval_ms,
+                       tree_format='tree', summary_top_k=None, algorithm=None):
+        """
+        Search and make a move for the player to move, streaming progress.
+
+        Returns:
+            dict: The new game state, or None if the move was not made
+        """
+        player = state['current_player']
+        engine = None
+        if algorithm == 'mcts':
+            # Takes the game's lock, which must never block the event loop
+            engine = await asyncio.to_thread(mcts_engine, self.session, player)
+        if engine is None:
+            result = opening_book.get(book_key(state['board'], player, use_alpha_beta,
+                                               include_tree, None, tree_format, summary_top_k))
+            if result is not None:
+                return await self._play_result(state, player,
+                                               dict(result, decision_time_ms=0.0, preloaded=True))
+        relay = None
+        if search_pool.supports_progress:
+            relay = ProgressRelay(asyncio.get_running_loop())
+
+        cancel_event = search_pool.cancel_event()
+        try:
+            future = search_pool.submit(run_search, state, player, use_alpha_beta, include_tree,
+                                        relay.publish if relay else None, None, cancel_event,
+                                        tree_format, summary_top_k, engine)
+        except SearchPoolFull:
+            await self.send_json({'type': 'error', 'message': 'Server is busy, try again shortly'})
+            return None
+
+        search = asyncio.wrap_future(future)
+        try:
+            while relay and not search.done():
+                progress = asyncio.ensure_future(relay.next())
+                await asyncio.wait({search, progress}, return_when=asyncio.FIRST_COMPLETED)
+                if not progress.done():
+                    progress.cancel()
+                    break
+
+                nodes_explored, best_move = progress.result()
+                await self.send_json({
+                    'type': 'progress',
+                    'player': player,
+                    'nodes_explored': nodes_explored,
+                    'best_move': _move_dict(best_move)
+                })
+                # Throttle: anything published meanwhile is coalesced into one report
+                await asyncio.wait({search}, timeout=progress_interval_ms / 1000)
+
+            # Unlike awaiting the search, wait() does not raise when the
+            # search itself fails or is cancelled
+            await asyncio.wait({search})
+        except asyncio.CancelledError:
+            # The client left. Cancelling the future only stops a search
+            # that has not started; the event stops a running one.
+            search.cancel()
+            if cancel_event is not None:
+                cancel_event.set()
+            raise
+
+        # The search raised, was cancelled, or its worker process died
+        if search.cancelled() or search.exception() is not None:
+            error = None if search.cancelled() else search.exception()
+            logger.error("AI search failed for game %s", self.session.game_id, exc_info=error)
+            await self.send_json({'type': 'error', 'message': 'AI search failed'})
+            return None
+        return await self._play_result(state, player, search.result())
+
+    async def _play_result(self, state, player, result):
+        """
+        Make the move of a search result and send it to the client.
+
+        Returns:
+            dict: The new game state, or None if the move was not made
+        """
+        if result['move'] is None:
+            await self.send_json({'type': 'error', 'message': 'No valid moves available'})
+            return None
+
+        game_state = await asyncio.to_thread(play_searched_move, self.session, state,
+                                             result['move'])
+        if game_state is None:
+            await self.send_json({'type': 'error', 'message': 'Game changed during AI move'})
+            return None
+
+        await self.send_json({
+            'type': 'move',
+            'player': player,
+            'move': _move_dict(result['move']),
+            'game_state': game_state,
+            'stats': search_stats(result),
+            'decision_tree': result['decision_tree']
+        })
+        return game_state
+
+
+def _log_task_error(task):
+    """Log the error of an AI task that failed, e.g. on a closed socket."""
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("AI task failed", exc_info=task.exception())
+
+
+def _is_duration(value):
+    """Check that a duration option is a non-negative number of milliseconds."""
+    return (isinstance(value, (int, float)) and not isinstance(value, bool)
+            and value >= 0)
+
+
+def _move_dict(move):
+    """Convert a (row, col) tuple to the API's move format."""
+    if move is None:
+        return None
+    return {'row': move[0], 'col': move[1]}
+
+
+async def ai_game_socket(scope, receive, send):
+    """ASGI handler for the /api/ws/ai_game WebSocket."""
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    await send({'type': 'websocket.accept'})
+
+    query = parse_qs(scope.get('query_string', b'').decode())
+    game_id = query.get('game_id', [None])[0]
+    connection = AiGameConnection(games.get(game_id), send)
+    try:
+        while True:
+            message = await receive()
+            if message['type'] == 'websocket.disconnect':
+                break
+            if message['type'] != 'websocket.receive':
+                continue
+
+            try:
+                data = json.loads(message.get('text') or message.get('bytes') or '{}')
+            except ValueError:
+                await connection.send_json({'type': 'error', 'message': 'Invalid JSON'})
+                continue
+
+            command = data.get('type')
+            if command == 'stop':
+                connection.stop_requested = True
+            elif command in ('move', 'play'):
+                if connection.task and not connection.task.done():
+                    await connection.send_json({'type': 'error', 'message': 'AI is already thinking'})
+                    continue
+                tree_format = data.get('tree_format') or 'tree'
+                if tree_format not in TREE_FORMATS:
+                    await connection.send_json({'type': 'error',
+                                                'message': f"Unknown tree_format: {tree_format}"})
+                    continue
+                summary_top_k = data.get('summary_top_k')
+                if not is_top_k(summary_top_k):
+                    await connection.send_json({'type': 'error',
+                                                'message': 'summary_top_k must be a positive integer'})
+                    continue
+                delay_ms = data.get('delay_ms', 0)
+                progress_interval_ms = data.get('progress_interval_ms', PROGRESS_INTERVAL_MS)
+                if not _is_duration(delay_ms) or not _is_duration(progress_interval_ms):
+                    await connection.send_json({
+                        'type': 'error',
+                        'message': 'delay_ms and progress_interval_ms must be non-negative numbers'
+                    })
+                    continue
+                algorithm = data.get('algorithm')
+                if algorithm is not None and algorithm not in ALGORITHMS:
+                    await connection.send_json({'type': 'error',
+                                                'message': f"Unknown algorithm: {algorithm}"})
+                    continue
+                connection.task = asyncio.create_task(connection.play(
+                    use_alpha_beta=data.get('use_alpha_beta', True) and algorithm != 'minimax',
+                    include_tree=data.get('include_tree', command == 'move'),
+                    until_game_over=command == 'play',
+                    delay_ms=delay_ms,
+                    progress_interval_ms=progress_interval_ms,
+                    tree_format=tree_format,
+                    summary_top_k=summary_top_k,
+                    algorithm=algorithm
+                ))
+                connection.task.add_done_callback(_log_task_error)
+            else:
+                await connection.send_json({'type': 'error', 'message': f"Unknown command: {command}"})
+    finally:
+        if connection.task:
+            connection.task.cancel()
+
+
+# WebSocket routes served by asgi.py
+routes = {
+    '/api/ws/ai_game': ai_game_socket
+}
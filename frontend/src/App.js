@@ -1,6 +1,7 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import './App.css';
 import ApiService from './services/apiService';
+import GameSocket from './services/gameSocket';
 import Board from './components/Board';
 import Controls from './components/Controls';
 import Stats from './components/Stats';
@@ -27,6 +28,85 @@ function App() {
   });
   const [treeData, setTreeData] = useState(null);
   const [error, setError] = useState(null);
+  const [socketConnected, setSocketConnected] = useState(false);
+  
+  // WebSocket used for AI vs AI games when the backend supports it
+  const socketRef = useRef(null);
+  // Whether the AI is playing a full game over the socket
+  const playingRef = useRef(false);
+
+  // Apply an AI move received from the backend
+  const applyAiMove = useCallback((gameState, moveStats, decisionTree) => {
+    // Store the decision tree data
+    setTreeData(decisionTree);
+    
+    // Update the board state
+    const newBoard = convert2DTo1DBoard(gameState.board);
+    setBoard(newBoard);
+    setIsXNext(gameState.current_player === 'X');
+    
+    // Check for winner using our frontend calculation
+    const calculatedWinner = calculateWinner(newBoard);
+    if (calculatedWinner) {
+      setWinner(calculatedWinner);
+      setGameOver(true);
+    } else if (gameState.game_over) {
+      // If backend says game is over but we didn't detect a winner, it's a draw
+      setGameOver(true);
+    } else {
+      setGameOver(gameState.game_over);
+    }
+    
+    // Update performance stats
+    setStats(prevStats => ({
+      ...prevStats,
+      nodesExplored: moveStats.nodes_explored,
+      decisionTime: moveStats.decision_time_ms
+    }));
+  }, []);
+
+  // Handle messages pushed by the game socket
+  const handleSocketMessage = useCallback((message) => {
+    switch (message.type) {
+      case 'progress':
+        // Live node count while the AI is still searching
+        setStats(prevStats => ({ ...prevStats, nodesExplored: message.nodes_explored }));
+        break;
+      case 'move':
+        applyAiMove(message.game_state, message.stats, message.decision_tree);
+        if (!playingRef.current || message.game_state.game_over) {
+          setAiThinking(false);
+        }
+        break;
+      case 'game_over':
+        playingRef.current = false;
+        setAiThinking(false);
+        break;
+      case 'error':
+        playingRef.current = false;
+        setError(message.message);
+        setAiThinking(false);
+        break;
+      default:
+        break;
+    }
+  }, [applyAiMove]);
+
+  // Open the game socket in AI vs AI mode
+  useEffect(() => {
+    if (aiMode !== 'ai-ai') return undefined;
+    
+    const socket = new GameSocket(handleSocketMessage);
+    socketRef.current = socket;
+    socket.connect().then(connected => setSocketConnected(connected));
+    
+    return () => {
+      socket.close();
+      socketRef.current = null;
+      playingRef.current = false;
+      setSocketConnected(false);
+    };
+  }, [aiMode, handleSocketMessage]);
 
   // Handle AI move - using useCallback to memoize the function
   const handleAiMove = useCallback(async () => {
@@ -35,6 +115,13 @@ function App() {
     setAiThinking(true);
     setError(null);
     
+    // Use the game socket when it is connected, so progress is streamed
+    const socket = socketRef.current;
+    if (aiMode === 'ai-ai' && socket && socket.isOpen()) {
+      socket.aiMove(stats.useAlphaBeta);
+      return;
+    }
+    
     try {
       // Get the current player
       const player = isXNext ? 'X' : 'O';
@@ -45,43 +132,25 @@ function App() {
         player
       );
       
-      // Update game state
-      const gameState = response.game_state;
-      const moveStats = response.stats;
-      
-      // Store the decision tree data
-      setTreeData(response.decision_tree);
-      
-      // Update the board state
-      const newBoard = convert2DTo1DBoard(gameState.board);
-      setBoard(newBoard);
-      setIsXNext(gameState.current_player === 'X');
-      
-      // Check for winner using our frontend calculation
-      const calculatedWinner = calculateWinner(newBoard);
-      if (calculatedWinner) {
-        setWinner(calculatedWinner);
-        setGameOver(true);
-      } else if (gameState.game_over) {
-        // If backend says game is over but we didn't detect a winner, it's a draw
-        setGameOver(true);
-      } else {
-        setGameOver(gameState.game_over);
-      }
-      
-      // Update performance stats
-      setStats(prevStats => ({
-        ...prevStats,
-        nodesExplored: moveStats.nodes_explored,
-        decisionTime: moveStats.decision_time_ms
-      }));
+      applyAiMove(response.game_state, response.stats, response.decision_tree);
     } catch (err) {
       console.error('Failed to get AI move:', err);
       setError('Failed to get AI move. Please try again.');
     } finally {
       setAiThinking(false);
     }
-  }, [gameOver, isXNext, stats.useAlphaBeta, setAiThinking, setError, setTreeData, setBoard, setIsXNext, setWinner, setGameOver, setStats]); // Add all dependencies
+  }, [gameOver, isXNext, aiMode, stats.useAlphaBeta, applyAiMove, setAiThinking, setError]); // Add all dependencies
+
+  // Let the AI play the rest of the game over the socket
+  const playFullGame = useCallback(() => {
+    const socket = socketRef.current;
+    if (gameOver || !socket || !socket.isOpen()) return;
+    
+    setAiThinking(true);
+    setError(null);
+    playingRef.current = true;
+    socket.playGame(stats.useAlphaBeta);
+  }, [gameOver, stats.useAlphaBeta]);
 
   // Reset the game - using useCallback to memoize the function
   const resetGame = useCallback(async () => {
@@ -201,7 +270,17 @@ function App() {
     
     try {
       const { row, col } = indexToCoords(index);
-      const response = await ApiService.makeMove(row, col);
+      
+      // Against the AI, send our move and get its reply in a single request
+      const response = aiMode === 'human-ai'
+        ? await ApiService.playTurn(row, col, stats.useAlphaBeta, 'O', showTree)
+        : await ApiService.makeMove(row, col);
+      
+      if (response.move) {
+        applyAiMove(response.game_state, response.stats, response.decision_tree);
+        return;
+      }
+      
       const gameState = response.game_state;
       
       // Update the board state
@@ -230,7 +309,7 @@ function App() {
     } finally {
       setAiThinking(false);
     }
-  }, [gameOver, board, aiThinking, aiMode, isXNext]);
+  }, [gameOver, board, aiThinking, aiMode, isXNext, stats.useAlphaBeta, showTree, applyAiMove]);
 
   return (
     <div className="app">
@@ -262,6 +341,7 @@ function App() {
             toggleAlphaBeta={toggleAlphaBeta}
             toggleStats={toggleStats}
             handleAiMove={handleAiMove}
+            playFullGame={socketConnected ? playFullGame : null}
             aiMode={aiMode}
             showStats={showStats}
             useAlphaBeta={stats.useAlphaBeta}
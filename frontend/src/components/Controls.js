@@ -6,6 +6,7 @@ const Controls = ({
   toggleAlphaBeta,
   toggleStats,
   handleAiMove,
+  playFullGame,
   aiMode,
   showStats,
   useAlphaBeta,
@@ -28,6 +29,12 @@ const Controls = ({
         </button>
       )}
       
+      {aiMode === 'ai-ai' && !gameOver && playFullGame && (
+        <button onClick={playFullGame} disabled={aiThinking}>
+          Play Full Game
+        </button>
+      )}
+      
       <button onClick={toggleStats} disabled={aiThinking}>
         {showStats ? 'Hide Stats' : 'Show Stats'}
       </button>
@@ -1,5 +1,6 @@
 import React, { useEffect, useRef, useState } from 'react';
 import './GameTreeViz.css';
+import { getTreeRoot } from '../utils/treeUtils';
 
 /**
  * Enhanced Game Tree Visualization Component with cleaner display
@@ -37,11 +38,11 @@ const GameTreeViz = ({ treeData, useAlphaBeta }) => {
   
   // Process tree data and calculate positions
   useEffect(() => {
-    if (!treeData || !treeData.root) return;
+    const root = getTreeRoot(treeData, maxDepth);
+    if (!root) return;
     
     // Calculate positions
     const positions = [];
-    const root = treeData.root;
     
     const processNode = (node, x, y, width, depth, index = 0, parentIndex = -1, pathIndices = []) => {
       if (!node) return;
@@ -461,9 +462,9 @@ const GameTreeViz = ({ treeData, useAlphaBeta }) => {
     // Get the move that led to this state
     const moveText = node.move ? `Move: (${node.move[0]},${node.move[1]})` : 'Root';
     
-    // Create info box
+    // Create info box, with room for the subtree statistics of summary trees
     const infoWidth = 180;
-    const infoHeight = 90;
+    const infoHeight = 90 + getSummaryLines(node).length * 20;
     const infoX = x + radius + 20;
     const infoY = y - infoHeight / 2;
     
@@ -547,6 +548,30 @@ const GameTreeViz = ({ treeData, useAlphaBeta }) => {
     ctx.fillText(moveText, x + 10, y + 45);
     ctx.fillText(`Player: ${node.isMaximizing ? 'Maximizing (X)' : 'Minimizing (O)'}`, x + 10, y + 65);
     ctx.fillText(`Score: ${node.score !== null ? node.score : 'Not evaluated'}`, x + 10, y + 85);
+    getSummaryLines(node).forEach((line, i) => {
+      ctx.fillText(line, x + 10, y + 105 + i * 20);
+    });
+  };
+  
+  // Describe the aggregate statistics attached to nodes of summary trees
+  const getSummaryLines = (node) => {
+    const lines = [];
+    if (node.summary && node.summary.nodes > 1) {
+      const { nodes, wins, draws, losses } = node.summary;
+      lines.push(`Subtree: ${nodes} nodes`);
+      lines.push(`W/D/L leaves: ${wins}/${draws}/${losses}`);
+    }
+    if (node.collapsed) {
+      const { nodes, pruned, minScore, maxScore } = node.collapsed;
+      lines.push(`Hidden: ${nodes} nodes, ${pruned} pruned`);
+      if (minScore !== null) {
+        lines.push(`Hidden scores: ${minScore} to ${maxScore}`);
+      }
+    }
+    if (node.truncated) {
+      lines.push('Subtree not recorded (node budget)');
+    }
+    return lines;
   };
   
   // Handle mouse interactions - This is the key function to fix hover issues
@@ -3,6 +3,9 @@
 
 const API_BASE_URL = 'http://localhost:5001/api';
 
+// Decision trees are requested as DAGs, which GameTreeViz expands
+export const TREE_FORMAT = 'dag';
+
 /**
  * API Service for TicTacMaster
  */
@@ -74,7 +77,7 @@ class ApiService {
           'Content-Type': 'application/json',
         },
         credentials: 'include',
-        body: JSON.stringify({ use_alpha_beta: useAlphaBeta, player }),
+        body: JSON.stringify({ use_alpha_beta: useAlphaBeta, player, tree_format: TREE_FORMAT }),
       });
       
       if (!response.ok) {
@@ -102,7 +105,7 @@ class ApiService {
           'Content-Type': 'application/json',
         },
         credentials: 'include',
-        body: JSON.stringify({ use_alpha_beta: useAlphaBeta, player }),
+        body: JSON.stringify({ use_alpha_beta: useAlphaBeta, player, tree_format: TREE_FORMAT }),
       });
       
       if (!response.ok) {
@@ -116,6 +119,74 @@ class ApiService {
     }
   }
 
+  /**
+   * Make a human move and let the AI reply in a single request
+   * @param {number} row Row index (0-2)
+   * @param {number} col Column index (0-2)
+   * @param {boolean} useAlphaBeta Whether to use Alpha-Beta pruning
+   * @param {string} player AI's player symbol ('X' or 'O')
+   * @param {boolean} includeTree Whether to include the AI's decision tree
+   * @param {number|null} treeDepth Deepest tree level to include, or null for all
+   * @returns {Promise<Object>} Response with both moves, the updated game state and stats
+   */
+  static async playTurn(row, col, useAlphaBeta = true, player = 'O', includeTree = false, treeDepth = null) {
+    try {
+      const response = await fetch(`${API_BASE_URL}/play_turn`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        credentials: 'include',
+        body: JSON.stringify({
+          row,
+          col,
+          use_alpha_beta: useAlphaBeta,
+          player,
+          include_tree: includeTree,
+          tree_depth: treeDepth,
+          tree_format: TREE_FORMAT
+        }),
+      });
+      
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+      
+      return await response.json();
+    } catch (error) {
+      console.error('Error playing turn:', error);
+      throw error;
+    }
+  }
+
+  /**
+   * Get exact scores and principal variations for the best moves
+   * @param {number|null} topK Number of moves to score, or null for all legal moves
+   * @param {string|null} player Player to score the moves for, defaults to the player to move
+   * @returns {Promise<Object>} Response with the scored moves, best first
+   */
+  static async getAnalysis(topK = null, player = null) {
+    try {
+      const response = await fetch(`${API_BASE_URL}/analysis`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        credentials: 'include',
+        body: JSON.stringify({ top_k: topK, player }),
+      });
+      
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+      
+      return await response.json();
+    } catch (error) {
+      console.error('Error getting analysis:', error);
+      throw error;
+    }
+  }
+
   /**
    * Get the current game state
    * @returns {Promise<Object>} Response from the server with the current game state
@@ -141,9 +212,11 @@ class ApiService {
    * Get the decision tree for the current game state
    * @param {boolean} useAlphaBeta Whether to use Alpha-Beta pruning
    * @param {string} player Player to calculate the tree for ('X' or 'O')
+   * @param {string} treeFormat 'tree', 'dag', or 'summary' for the best lines only
+   * @param {number|null} summaryTopK Lines kept at each node of a summary tree
    * @returns {Promise<Object>} Response with the decision tree data
    */
-  static async getDecisionTree(useAlphaBeta = true, player = null) {
+  static async getDecisionTree(useAlphaBeta = true, player = null, treeFormat = TREE_FORMAT, summaryTopK = null) {
     try {
       const response = await fetch(`${API_BASE_URL}/decision_tree`, {
         method: 'POST',
@@ -153,7 +226,9 @@ class ApiService {
         credentials: 'include',
         body: JSON.stringify({ 
           use_alpha_beta: useAlphaBeta,
-          player: player 
+          player: player,
+          tree_format: treeFormat,
+          summary_top_k: summaryTopK
         }),
       });
       
@@ -0,0 +1,103 @@
+// TicTacMaster Game Socket
+// Persistent WebSocket channel for AI moves. Only available when the backend
+// runs in ASGI mode; callers should fall back to ApiService otherwise.
+
+import { TREE_FORMAT } from './apiService';
+
+const SOCKET_URL = 'ws://localhost:5001/api/ws/ai_game';
+
+/**
+ * WebSocket client for AI vs AI games
+ */
+class GameSocket {
+  /**
+   * @param {Function} onMessage Called with every parsed server message
+   */
+  constructor(onMessage) {
+    this.onMessage = onMessage;
+    this.socket = null;
+  }
+
+  /**
+   * Open the connection
+   * @returns {Promise<boolean>} Whether the connection was established
+   */
+  connect() {
+    return new Promise((resolve) => {
+      try {
+        this.socket = new WebSocket(SOCKET_URL);
+      } catch (error) {
+        console.error('Error opening game socket:', error);
+        resolve(false);
+        return;
+      }
+
+      this.socket.onopen = () => resolve(true);
+      this.socket.onerror = () => resolve(false);
+      this.socket.onclose = () => {
+        this.socket = null;
+      };
+      this.socket.onmessage = (event) => {
+        try {
+          this.onMessage(JSON.parse(event.data));
+        } catch (error) {
+          console.error('Error handling game socket message:', error);
+        }
+      };
+    });
+  }
+
+  /**
+   * @returns {boolean} Whether the socket is open
+   */
+  isOpen() {
+    return this.socket !== null && this.socket.readyState === WebSocket.OPEN;
+  }
+
+  /**
+   * Let the AI make one move
+   * @param {boolean} useAlphaBeta Whether to use Alpha-Beta pruning
+   */
+  aiMove(useAlphaBeta = true) {
+    this.send({ type: 'move', use_alpha_beta: useAlphaBeta, include_tree: true, tree_format: TREE_FORMAT });
+  }
+
+  /**
+   * Let the AI play both sides until the game is over
+   * @param {boolean} useAlphaBeta Whether to use Alpha-Beta pruning
+   * @param {number} delayMs Pause between moves in milliseconds
+   */
+  playGame(useAlphaBeta = true, delayMs = 500) {
+    this.send({ type: 'play', use_alpha_beta: useAlphaBeta, delay_ms: delayMs });
+  }
+
+  /**
+   * Stop a game started with playGame after the current move
+   */
+  stop() {
+    this.send({ type: 'stop' });
+  }
+
+  /**
+   * Send a command to the server
+   * @param {Object} message Command to send
+   */
+  send(message) {
+    if (!this.isOpen()) {
+      throw new Error('Game socket is not connected');
+    }
+    this.socket.send(JSON.stringify(message));
+  }
+
+  /**
+   * Close the connection
+   */
+  close() {
+    if (this.socket) {
+      this.socket.close();
+      this.socket = null;
+    }
+  }
+}
+
+export default GameSocket;
@@ -0,0 +1,45 @@
+/**
+ * Utility functions for decision tree data
+ */
+
+/**
+ * Expand one node of a DAG-format decision tree
+ * @param {Object} dag - Decision tree with format 'dag'
+ * @param {number} index - Index of the node in dag.nodes
+ * @param {Object|null} edge - Edge the node was reached through, null for the root
+ * @param {number} depth - Number of levels to expand below the node
+ * @returns {Object} Tree node with the same fields as the 'tree' format
+ */
+const expandDagNode = (dag, index, edge, depth) => {
+  const { children, ...node } = dag.nodes[index];
+  const expanded = {
+    ...node,
+    move: edge ? edge.move : null,
+    isBestMove: edge ? edge.isBestMove : false,
+    pruned: edge ? edge.pruned : false
+  };
+
+  if (children && depth > 0) {
+    expanded.children = children.map(child => expandDagNode(dag, child.node, child, depth - 1));
+  }
+  return expanded;
+};
+
+/**
+ * Get the root of a decision tree as nested nodes
+ *
+ * DAG-format trees emit repeated subtrees once and reference them by index.
+ * They are expanded here, only down to the depth that will be displayed,
+ * since the full expansion can be far larger than the DAG itself.
+ *
+ * @param {Object} treeData - Decision tree returned by the API
+ * @param {number} maxDepth - Number of levels below the root to expand
+ * @returns {Object|null} Root node with nested children
+ */
+export const getTreeRoot = (treeData, maxDepth) => {
+  if (!treeData) return null;
+  if (treeData.format === 'dag') {
+    return expandDagNode(treeData, treeData.root, null, maxDepth);
+  }
+  return treeData.root || null;
+};